@@ -1,444 +1,240 @@
 import os
-import dotenv
 import time
+import dotenv
 import asyncio
-import gspread
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta, timezone
-from telegram import Bot
-from oauth2client.service_account import ServiceAccountCredentials
+import functools
+import multiprocessing
+import metrics
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from context import AppContext
+from watcher import SnapshotWatcher
+from records import SHEET_HEADERS
+from dedup import DedupStore
+from outbox import OUTBOX_DB, Outbox
+from archive import ARCHIVE_DIR, JobArchive
+from recent import RecentJobs
+from search import SEARCH_DAYS, JobIndex, serve_find
+from neardup import NEARDUP_MODE, NearDupIndex
+from routing import Router, build_sinks, worksheet_indices
+from messages import format_message, format_search_results
+from pipeline import Pipeline
+from upwork_parser import SnapshotFilter, parse_new_tiles, parse_snapshot_file
 
 
 # Load environment variables
 dotenv.load_dotenv()
 
-# Load Google Sheets credentials from environment variable
-google_credentials_path = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH')
-if not google_credentials_path:
-    raise ValueError("The Google Sheets credentials path is not set in the environment variables")
-
-# Google Sheets authorization
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_name(google_credentials_path, scope)
-client = gspread.authorize(creds)
-
-# Open Google Spreadsheet
-sheet_url = "https://docs.google.com/spreadsheets/d/1lqSgbqWif-iyyL6KEOunCI7TaCGgIVC7P3__btNmjIE/edit?usp=sharing"
-spreadsheet = client.open_by_url(sheet_url)
-worksheet = spreadsheet.get_worksheet(0)
-
-# Add headers if missing
-# NOTE: Location moved between Project Title and Details
-header_names = [
-    "Posted",
-    "Project Title",
-    "Location",
-    "Details",
-    "Payment Status",
-    "Total Spent",
-    "Description",
-    "Skills",
-    "Project URL",
-]
-
-if not worksheet.row_values(1):
-    worksheet.insert_row(header_names, index=1)
-
-# Telegram Bot
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-bot = Bot(token=TELEGRAM_TOKEN)
+# Worker threads for blocking Sheets calls and HTML parsing
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+executor = ThreadPoolExecutor(max_workers=IO_WORKERS)
 
+# Skip unchanged snapshots and already handled tiles before parse_project
+INCREMENTAL_PARSE = os.getenv("INCREMENTAL_PARSE", "1").lower() in ("1", "true", "yes")
+snapshot_filter = SnapshotFilter() if INCREMENTAL_PARSE else None
 
-async def send_mail(chat_id, content):
-    try:
-        await bot.send_message(chat_id=chat_id, text=content)
-    except Exception as e:
-        print(f"Failed to send message: {e}")
+# Parser processes for snapshot files; 0 parses on the thread pool above.
+# Workers are spawned on the first snapshot, not forked: by then the
+# thread pool is busy with Sheets auth, and forking a threaded process can
+# deadlock. Importing this module has no side effects, so spawn is cheap.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
 
 
-def clean_text(value: str) -> str:
-    if not value:
-        return ""
-    return " ".join(value.split())
+def new_parse_pool() -> ProcessPoolExecutor | None:
+    if PARSE_WORKERS <= 0:
+        return None
+    return ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
 
 
-def get_latest_upwork_file(directory=".") -> str | None:
-    candidates = []
-    for name in os.listdir(directory):
-        if name.lower().startswith("upwork") and name.lower().endswith(".html"):
-            full = os.path.join(directory, name)
-            if os.path.isfile(full):
-                candidates.append(full)
+parse_pool = new_parse_pool()
 
-    if not candidates:
-        return None
+# Longest wait before a snapshot whose processing failed is tried again
+SNAPSHOT_RETRY_MAX = float(os.getenv("SNAPSHOT_RETRY_MAX", "300"))
+
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+# Chats allowed to use /find (comma-separated ids)
+SEARCH_CHATS = {c.strip() for c in os.getenv("SEARCH_CHATS", TELEGRAM_CHAT_ID or "").split(",") if c.strip()}
+
+# Google Sheets, Telegram and rules.json (RULES_FILE) are opened on first
+# use, not on import
+context = AppContext(executor=executor)
 
-    return max(candidates, key=os.path.getmtime)
 
+# ------------ MAIN LOOP ------------
+
+async def run_blocking(fn, *args):
+    """
+    Runs a blocking call (gspread, file parsing) on the bounded worker pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args))
 
-# ------------ CATEGORY HELPERS ------------
 
-def categorize_job(title: str, description: str, skills: str) -> str:
+async def parse(file_path: str) -> tuple[bytes | None, list]:
     """
-    Rule-based job categorization based on your 3 profiles:
-      - UI/UX Design
-      - Mobile Development
-      - Full Stack (.NET / C# / React / AI / Angular)
-    Uses title + description + skills ONLY.
+    Parses one snapshot on the parser processes, or the thread pool;
+    returns (digest, records) for snapshot_filter.confirm(). If a parser
+    process died, the pool is replaced and this file is parsed on the
+    thread pool instead.
     """
-    text = f"{title} {description} {skills}".lower()
-
-    categories = {
-        "UI/UX Design": [
-            # Core
-            "ui", "ux", "ui/ux", "ux/ui", "product design", "interface design",
-            "user interface", "user experience", "ux research", "user research",
-            "design system", "component library", "style guide",
-            # Tools
-            "figma", "adobe xd", "sketch", "invision", "zeplin",
-            # Types of work
-            "wireframe", "wireframing", "prototype", "prototyping",
-            "high-fidelity", "low-fidelity", "lo-fi", "hi-fi",
-            "landing page design", "web app design", "dashboard design",
-            "saas dashboard", "web dashboard", "admin dashboard",
-            "mobile app design", "app redesign", "website redesign",
-            "responsive design", "responsive ui", "ui redesign",
-        ],
-        "Mobile Development": [
-            # Platforms
-            "android", "ios", "iphone", "ipad", "play store", "app store",
-            # Tech
-            "swift", "objective-c", "kotlin", "java (android)", "jetpack compose",
-            "react native", "flutter", "dart",
-            # Phrases
-            "mobile app", "mobile application", "mobile development",
-            "cross-platform", "cross platform",
-            "apk", "ipa",
-            "push notification", "push notifications",
-            "in-app purchase", "in app purchase",
-            "firebase", "onesignal",
-            "background service", "background task",
-        ],
-        "Full Stack (.NET/React/AI)": [
-            # Backend .NET / C#
-            "asp.net", "asp .net", "asp.net core", ".net core", "dotnet", "c#",
-            "asp.net mvc", "mvc", "web api", "rest api", "webapi",
-            "entity framework", "ef core", "linq",
-            "clean architecture", "ddd", "onion architecture",
-            # Frontend JS frameworks
-            "react", "react.js", "react js", "next.js", "nextjs",
-            "angular", "angularjs", "typescript", "javascript",
-            "spa", "single page application",
-            # General full stack
-            "full stack", "full-stack", "frontend and backend",
-            "end-to-end", "end to end",
-            # Cloud / DevOps
-            "azure", "aws", "gcp", "docker", "kubernetes", "ci/cd",
-            "pipeline", "azure devops", "github actions",
-            # Data
-            "sql server", "mssql", "postgresql", "mysql", "database design",
-            # AI
-            "ai", "openai", "chatgpt", "gpt", "llm",
-            "machine learning", "ml", "rag", "langchain",
-        ],
-    }
-
-    best_cat = "Other"
-    best_score = 0
-
-    for cat, keywords in categories.items():
-        score = sum(1 for kw in keywords if kw in text)
-        if score > best_score:
-            best_score = score
-            best_cat = cat
-
-    return best_cat
-
-
-def category_symbols(category: str) -> str:
+    global parse_pool
+    if snapshot_filter is not None:
+        job = functools.partial(parse_new_tiles, file_path, *snapshot_filter.known())
+    else:
+        job = functools.partial(parse_snapshot_file, file_path)
+
+    loop = asyncio.get_running_loop()
+    pool = parse_pool
+    result = None
+    if pool is not None:
+        try:
+            result = await loop.run_in_executor(pool, job)
+        except BrokenProcessPool as e:
+            if parse_pool is pool:  # several files may see the same broken pool
+                print(f"Parser processes died ({e}), starting new ones")
+                pool.shutdown(wait=False, cancel_futures=True)
+                parse_pool = new_parse_pool()
+    if result is None:
+        result = await loop.run_in_executor(executor, job)
+    return result if snapshot_filter is not None else (None, result)
+
+
+async def parse_snapshots(watcher, parsed: asyncio.Queue):
     """
-    Map category to a single prefix symbol for Google Sheet title.
-    (Only used at the START of the title.)
+    Starts parsing each snapshot as soon as it arrives, off the event loop,
+    and queues (path, saved_at, future) in arrival order. With
+    PARSE_WORKERS > 0 up to that many files are parsed in parallel
+    processes; the consumer still takes them one by one in order.
     """
-    mapping = {
-        "UI/UX Design": "🎨",
-        "Mobile Development": "📱",
-        "Full Stack (.NET/React/AI)": "🧠",
-        "Other": "",
-    }
-    return mapping.get(category, "")
+    while True:
+        file_path = await watcher.get()
+        print(f"Using HTML file: {file_path}")
 
+        try:
+            saved_at = os.path.getmtime(file_path)
+            metrics.SNAPSHOT_WAIT.observe(max(0.0, time.time() - saved_at))
+        except OSError:
+            saved_at = None
+        metrics.SNAPSHOTS.inc()
+
+        # Timed here rather than in the parser, which may run in another process
+        start = time.perf_counter()
+        future = asyncio.ensure_future(parse(file_path))
+        future.add_done_callback(lambda f, start=start: metrics.PARSE_TIME.observe(time.perf_counter() - start))
+        await parsed.put((file_path, saved_at, future))
 
-# ------------ MAIN LOOP ------------
 
 async def monitor_upwork():
-    total_projects = []
+    rules = context.rules
+    watcher = SnapshotWatcher(".")
+    metrics_server = parser_task = find_task = None
+    dedup = outbox = router = archive = None
+    try:
+        metrics_server = await metrics.serve()
+        await watcher.start()
+        print(f"Watching for upwork*.html files ({watcher.mode})")
+
+        # Bounds how many snapshots are parsed ahead of the consumer
+        parsed = asyncio.Queue(maxsize=max(1, PARSE_WORKERS))
+        parser_task = asyncio.create_task(parse_snapshots(watcher, parsed))
+
+        # Sheets auth, worksheet headers, the dedup store and the outbox open
+        # concurrently, while the first snapshots are already being parsed
+        worksheets, dedup, outbox = await asyncio.gather(
+            context.worksheets(worksheet_indices(rules.current.sinks), headers={0: SHEET_HEADERS}),
+            run_blocking(DedupStore),
+            run_blocking(Outbox) if OUTBOX_DB else asyncio.sleep(0),
+        )
 
-    while True:
-        try:
-            file_path = get_latest_upwork_file(".")
-            if not file_path:
-                print("No upwork*.html file found. Waiting...")
-                await asyncio.sleep(5)
+        # Sinks named in rules.json: the main worksheet and the Telegram chat.
+        # Routed jobs go through the outbox (OUTBOX_DB) and survive failed
+        # deliveries and restarts
+        router = Router(
+            build_sinks(rules.current.sinks, worksheets.__getitem__, context.dispatcher, format_message),
+            run_blocking,
+            outbox,
+        )
+        if outbox is not None:
+            router.start()
+        reposts = NearDupIndex() if NEARDUP_MODE != "off" else None
+        # Every new job also goes to the local Parquet archive (ARCHIVE_DIR)
+        if ARCHIVE_DIR:
+            try:
+                archive = JobArchive()
+            except RuntimeError as e:
+                print(f"Job archive off: {e}")
+
+        # The last RECENT_JOBS jobs (SEARCH_DAYS at most), packed in memory and
+        # shared: /find searches them, repost detection forgets what they drop
+        recent = RecentJobs(max_age=SEARCH_DAYS * 86400 if SEARCH_DAYS > 0 else None)
+        if reposts is not None:
+            recent.subscribe(on_evict=lambda seq, record: reposts.discard(record.job_id))
+
+        # /find over those jobs, warmed from the archive
+        if SEARCH_DAYS > 0:
+            index = JobIndex(recent)
+            if archive is not None:
+                print(f"Search index: {await run_blocking(index.warm_from_archive, archive.root)} archived jobs")
+            if SEARCH_CHATS:
+                find_task = asyncio.create_task(
+                    serve_find(context.bot, index, context.dispatcher.send, SEARCH_CHATS, format_search_results)
+                )
+        pipeline = Pipeline(rules, dedup, router, run_blocking, reposts, archive=archive, recent=recent)
+
+        failures: dict[str, int] = {}  # failed attempts per snapshot still on disk
+        while True:
+            file_path, saved_at, future = await parsed.get()
+            try:
+                digest, records = await future
+            except Exception as e:
+                print(f"File read error: {e}")
+                watcher.done(file_path)
                 continue
 
-            print(f"Using HTML file: {file_path}")
-
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    html_content = f.read()
-            except Exception:
-                print("File read error")
-                await asyncio.sleep(5)
+                await pipeline.process(records, saved_at)
+            except Exception as e:
+                # The file stays; it is processed again, backing off while it keeps failing
+                failures[file_path] = failures.get(file_path, 0) + 1
+                delay = min(2 ** failures[file_path], SNAPSHOT_RETRY_MAX)
+                print(f"Error: {e}, retrying {file_path} in {delay}s")
+                watcher.retry(file_path, delay)
                 continue
 
-            soup = BeautifulSoup(html_content, "html.parser")
-            div_elements = soup.find_all(attrs={"data-ev-label": "search_results_impression"})
-            div_elements.reverse()
-
-            for div in div_elements:
-                project_details = parse_project(div)
-                if not project_details:
-                    continue
-
-                project_url = project_details[3]
-
-                if project_url not in total_projects:
-                    base_title = project_details[2]
-                    location_text = project_details[5]
-                    details_text = project_details[6]
-                    description_text = project_details[7]
-                    skills_text = project_details[8]
-
-                    # --- CATEGORY TAGGING FOR SHEET TITLE ---
-                    category = categorize_job(base_title, description_text, skills_text)
-                    cat_sym = category_symbols(category)
-
-                    sheet_title = base_title
-                    if cat_sym:
-                        sheet_title = f"{cat_sym} {sheet_title}"
-
-                    # NOTE: Location moved between Title and Details
-                    row = [
-                        project_details[1],  # Posted timestamp
-                        sheet_title,         # Decorated title for Google Sheet
-                        location_text,       # Location (moved here)
-                        details_text,        # Details
-                        project_details[9],  # Payment Status
-                        project_details[4],  # Total spent
-                        description_text,    # Description
-                        skills_text,         # Skills
-                        project_details[3],  # URL
-                    ]
-
-                    try:
-                        worksheet.insert_row(row, 2)
-                        await send_mail(TELEGRAM_CHAT_ID, format_message(project_details))
-                    except Exception as e:
-                        print(f"Insert error: {e}")
-
-                    time.sleep(1)
-
-                total_projects.append(project_url)
-
-            if len(total_projects) > 200:
-                total_projects = total_projects[-200:]
-
+            failures.pop(file_path, None)
+            # Only now are its tiles skipped in later saves of the page
+            if snapshot_filter is not None:
+                snapshot_filter.confirm(digest, records)
+            if watcher.changed(file_path):
+                print(f"Kept {file_path}: saved again while it was processed")
+            else:
+                try:
+                    os.remove(file_path)
+                    print(f"Deleted processed file: {file_path}")
+                except Exception:
+                    pass
+            watcher.done(file_path)
+    finally:
+        # Stop taking work, then close everything that holds a file or a process
+        for task in (parser_task, find_task):
+            if task is not None:
+                task.cancel()
+        watcher.stop()
+        if router is not None:
             try:
-                os.remove(file_path)
-                print(f"Deleted processed file: {file_path}")
-            except Exception:
+                await router.close()
+            except asyncio.CancelledError:  # cancelled again while shutting down
                 pass
-
-            await asyncio.sleep(1)
-
-        except Exception as e:
-            print("Error:", e)
-            await asyncio.sleep(30)
-
-
-# ------------ PARSING ------------
-
-def parse_project(div):
-    try:
-        # Timestamp
-        jst = timezone(timedelta(hours=10))
-        posted_time = datetime.now(jst).strftime("%m/%d %H:%M")
-
-        # ----- TITLE -----
-        title_link = (
-            div.find("a", attrs={"data-test": "job-tile-title-link UpLink"})
-            or div.find("a", class_="air3-link")
-        )
-
-        if not title_link:
-            return None
-
-        project_title = clean_text(title_link.get_text(separator=" ", strip=True))
-
-        href = title_link.get("href", "")
-        project_url = href if href.startswith("http") else "https://www.upwork.com" + href
-
-        # ----- POSTED AGO -----
-        header = div.find(attrs={"data-test": "JobTileHeader"})
-        if header and header.find("small"):
-            small = header.find("small")
-            spans = small.find_all("span")
-            if len(spans) > 1:
-                project_posted = clean_text(spans[1].text)
-            else:
-                project_posted = clean_text(small.text)
-        else:
-            project_posted = "None"
-
-        # ----- PAYMENT VERIFIED -----
-        payment_el = div.find(attrs={"data-test": "payment-verified"})
-        if payment_el:
-            badge = payment_el.find(attrs={"data-test": "UpCVerifiedBadge"})
-            sr = badge.find("span", class_="sr-only") if badge else None
-            raw = sr.text.strip() if sr else ""
-            project_verified = f"Payment {raw.lower()}" if raw else "Payment status unknown"
-        else:
-            project_verified = "None"
-
-        project_verified = clean_text(project_verified)
-
-        # ----- SPENT -----
-        spent_el = div.find(attrs={"data-test": "total-spent"})
-        if spent_el:
-            strong = spent_el.find("strong")
-            span = spent_el.find("span")
-            if strong and span:
-                project_spent = clean_text(f"{strong.text} {span.text}")
-            else:
-                project_spent = clean_text(spent_el.text)
-        else:
-            project_spent = "No spent"
-
-        # ----- LOCATION -----
-        loc_el = div.find(attrs={"data-test": "location"})
-        if loc_el:
-            sr = loc_el.find("span", class_="sr-only")
-            if sr:
-                sr.extract()
-            project_location = clean_text(loc_el.text)
-        else:
-            project_location = "None"
-
-        # ----- DETAILS (job type + level + budget + duration) -----
-        job_info_ul = div.find("ul", attrs={"data-test": "JobInfo"})
-
-        job_type = ""
-        experience = ""
-        duration = ""
-        budget = ""
-
-        if job_info_ul:
-            # JOB TYPE (Fixed / Hourly / Hourly range)
-            type_el = job_info_ul.find("li", attrs={"data-test": "job-type-label"})
-            if type_el:
-                job_type = clean_text(type_el.text)
-
-            # EXPERIENCE LEVEL
-            exp_el = job_info_ul.find("li", attrs={"data-test": "experience-level"})
-            if exp_el:
-                experience = clean_text(exp_el.text)
-
-            # DURATION
-            dur_el = job_info_ul.find("li", attrs={"data-test": "duration-label"})
-            if dur_el:
-                duration = clean_text(dur_el.text)
-
-            # BUDGET (fixed price)
-            fixed_el = job_info_ul.find("li", attrs={"data-test": "is-fixed-price"})
-            if fixed_el:
-                budget = clean_text(fixed_el.text)
-
-            # HOURLY RANGE
-            hourly_el = job_info_ul.find("li", attrs={"data-test": "is-hourly"})
-            if hourly_el and not budget:
-                budget = clean_text(hourly_el.text)
-
-        details_parts = [x for x in [job_type, experience, budget, duration] if x]
-        project_details_info = " | ".join(details_parts)
-
-        # ----- DESCRIPTION -----
-        desc_el = div.find("div", attrs={"data-test": "UpCLineClamp JobDescription"})
-        description = clean_text(desc_el.text) if desc_el else ""
-        if len(description) > 3000:
-            description = description[:3000]
-
-        # ----- SKILLS -----
-        skills_el = div.find(attrs={"data-test": "TokenClamp JobAttrs"})
-        if skills_el:
-            skills = [
-                clean_text(span.text)
-                for span in skills_el.find_all(attrs={"data-test": "token"})
-            ]
-            skills_text = ", ".join(skills)
-        else:
-            skills_text = "No skills"
-
-        return [
-            project_posted,        # 0
-            posted_time,           # 1
-            project_title,         # 2
-            project_url,           # 3
-            project_spent,         # 4
-            project_location,      # 5
-            project_details_info,  # 6  DETAILS COLUMN
-            description,           # 7
-            skills_text,           # 8
-            project_verified       # 9
-        ]
-
-    except Exception as e:
-        print("Parse error:", e)
-        return None
-
-
-# ------------ TELEGRAM MESSAGE FORMAT ------------
-
-def format_message(d):
-    """
-    Formats the project details into a Telegram message string.
-    - Highlights embedded / firmware / hardware jobs.
-    - Places Description AFTER Total Spent.
-    """
-
-    title = d[2] or ""
-    description = d[7] or ""   # description is d[7]
-    skills = d[8] or ""
-
-    haystack = f"{title} {description} {skills}".lower()
-
-    embedded_keywords = [
-        "firmware", "embedded", "hardware", "iot",
-        "c++", "microcontroller",
-        "rtos", "freertos",
-        "arduino", "esp32", "esp8266", "stm32", "cortex",
-        "electric",
-        "circuit", "schematic",
-        "prototype", "pcb", "altium", "easyeda",
-        "gerber", "bom", "dfm",
-        "wifi", "bluetooth",
-        "robotics", "sensor",
-    ]
-
-    if any(k in haystack for k in embedded_keywords):
-        title = f"🔥 {title} 🔥"
-
-    return (
-        f"{title}\n\n"
-        f"Posted: {d[1]}\n"
-        f"Details: {d[6]}\n"
-        f"Location: {d[5]}\n"
-        f"Total Spent: {d[4]}\n\n"
-        f"Description:\n{description}\n\n"
-        f"Project URL:\n{d[3]}\n\n"
-        f"Skills:\n{skills}"
-    )
+        for store in (archive, outbox, dedup):
+            if store is not None:
+                try:
+                    store.close()
+                except Exception as e:
+                    print(f"Close error: {e}")
+        if metrics_server is not None:
+            metrics_server.close()
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == '__main__':
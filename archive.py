@@ -0,0 +1,288 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional, the archive is off without it
+    pa = None
+
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")  # empty turns the archive off
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "500"))
+ARCHIVE_MAX_DELAY = float(os.getenv("ARCHIVE_MAX_DELAY", "300"))
+
+
+def _schema():
+    # Repetitive text (skills, locations, categories, statuses) is stored
+    # as dictionary-encoded columns: an int index per row + one value list
+    words = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("seen_at", pa.timestamp("s", tz="UTC")),
+        ("job_id", pa.string()),
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("posted_time", pa.string()),
+        ("category", words),
+        ("location", words),
+        ("payment_status", words),
+        ("job_type", words),
+        ("experience", words),
+        ("skills", pa.list_(words)),
+        ("budget", pa.float64()),
+        ("hourly_min", pa.float64()),
+        ("hourly_max", pa.float64()),
+        ("total_spent_value", pa.float64()),
+        ("details", pa.string()),
+        ("description", pa.string()),
+    ])
+
+
+def _skill_list(skills: str) -> list[str]:
+    if not skills or skills == "No skills":
+        return []
+    return [s.strip() for s in skills.split(",") if s.strip()]
+
+
+def _day_dir(root: str, day) -> str:
+    return os.path.join(root, f"date={day.isoformat()}")
+
+
+class JobArchive:
+    """
+    Local history of every new job, one Parquet partition per day (UTC):
+
+      archive/date=2026-10-17/part-1760693400123.parquet
+
+    add() only buffers. flush() writes the buffer as one file per day.
+    Call it off the event loop when due(): `batch` jobs are waiting or the
+    oldest is `max_delay` seconds old. So the monitor pays for one file
+    write every few hundred jobs. When the day changes, the previous day's
+    parts are compacted into one file.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR, batch: int = ARCHIVE_BATCH,
+                 max_delay: float = ARCHIVE_MAX_DELAY, clock=time.time):
+        if pa is None:
+            raise RuntimeError("The job archive needs pyarrow (pip install pyarrow)")
+        self.root = root
+        self.batch = batch
+        self.max_delay = max_delay
+        self.clock = clock
+        self.schema = _schema()
+        self._rows: list[dict] = []
+        self._first_added: float | None = None
+        self._last_day = None
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, record, category: str | None = None):
+        now = self.clock()
+        row = {
+            "seen_at": int(now),
+            "job_id": record.job_id,
+            "url": record.url,
+            "title": record.title,
+            "posted_time": record.posted_time,
+            "category": category,
+            "location": record.location,
+            "payment_status": record.payment_status,
+            "job_type": record.job_type,
+            "experience": record.experience,
+            "skills": _skill_list(record.skills),
+            "budget": record.budget,
+            "hourly_min": record.hourly_min,
+            "hourly_max": record.hourly_max,
+            "total_spent_value": record.total_spent_value,
+            "details": record.details,
+            "description": record.description,
+        }
+        with self._lock:
+            if not self._rows:
+                self._first_added = now
+            self._rows.append(row)
+
+    def due(self) -> bool:
+        if not self._rows:
+            return False
+        return len(self._rows) >= self.batch or self.clock() - self._first_added >= self.max_delay
+
+    def flush(self) -> int:
+        """Writes the buffered jobs (blocking); returns how many."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._first_added = None
+        if not rows:
+            return 0
+
+        by_day: dict = {}
+        for row in rows:
+            day = datetime.fromtimestamp(row["seen_at"], timezone.utc).date()
+            by_day.setdefault(day, []).append(row)
+
+        stamp = int(self.clock() * 1000)
+        for day, day_rows in by_day.items():
+            directory = _day_dir(self.root, day)
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pylist(day_rows, schema=self.schema)
+            path = os.path.join(directory, f"part-{stamp}.parquet")
+            # Written under a temporary name, so a reader never sees half a file
+            pq.write_table(table, path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+
+        today = max(by_day)
+        if self._last_day is not None and self._last_day < today:
+            for day in by_day.keys() | {self._last_day}:
+                if day < today:
+                    self.compact(day)
+        self._last_day = today
+        return len(rows)
+
+    def compact(self, day) -> int:
+        """Merges a day's part files into one; returns how many were merged."""
+        parts = sorted(glob.glob(os.path.join(_day_dir(self.root, day), "part-*.parquet")))
+        if len(parts) < 2:
+            return len(parts)
+        table = pa.concat_tables([pq.read_table(p, schema=self.schema) for p in parts])
+        path = os.path.join(_day_dir(self.root, day), f"part-{int(self.clock() * 1000)}-all.parquet")
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+        for part in parts:
+            os.remove(part)
+        return len(parts)
+
+    def close(self):
+        self.flush()
+
+
+# ------------ QUERIES ------------
+
+def load(root: str = ARCHIVE_DIR, since: datetime | None = None, until: datetime | None = None,
+         columns: list[str] | None = None):
+    """
+    Archived jobs seen in [since, until) as one pyarrow Table. Only the
+    day partitions in range are opened, and only `columns` are read.
+    """
+    schema = _schema()
+    if columns is not None and "seen_at" not in columns:
+        columns = columns + ["seen_at"]
+
+    tables = []
+    for directory in sorted(glob.glob(os.path.join(root, "date=*"))):
+        day = date.fromisoformat(os.path.basename(directory)[len("date="):])
+        if since is not None and day < since.astimezone(timezone.utc).date():
+            continue
+        if until is not None and day > until.astimezone(timezone.utc).date():
+            continue
+        for part in sorted(glob.glob(os.path.join(directory, "part-*.parquet"))):
+            tables.append(pq.read_table(part, columns=columns, schema=schema))
+
+    if not tables:
+        fields = [schema.field(c) for c in columns] if columns else schema
+        return pa.Table.from_pylist([], schema=pa.schema(fields))
+
+    table = pa.concat_tables(tables)
+    if since is not None:
+        table = table.filter(pc.greater_equal(table["seen_at"], pa.scalar(since, pa.timestamp("s", tz="UTC"))))
+    if until is not None:
+        table = table.filter(pc.less(table["seen_at"], pa.scalar(until, pa.timestamp("s", tz="UTC"))))
+    return table
+
+
+def _with_skill(table, skill: str):
+    """Rows of `table` whose skills contain `skill` (case-insensitive)."""
+    flat = pc.utf8_lower(pc.cast(pc.list_flatten(table["skills"]), pa.string()))
+    parents = pc.list_parent_indices(table["skills"])
+    rows = pc.unique(pc.filter(parents, pc.equal(flat, skill.lower())))
+    return table.take(rows)
+
+
+def jobs_per(by: str = "category", unit: str = "hour", root: str = ARCHIVE_DIR,
+             since: datetime | None = None, until: datetime | None = None) -> list[tuple]:
+    """
+    Job counts per time bucket and `by` value, e.g. jobs per category per
+    hour: [(bucket start, value, count), ...] in time order.
+    """
+    table = load(root, since, until, columns=[by])
+    if not table.num_rows:
+        return []
+    grouped = pa.table({
+        "bucket": pc.floor_temporal(table["seen_at"], unit=unit),
+        by: pc.cast(table[by], pa.string()),
+    }).group_by(["bucket", by]).aggregate([([], "count_all")])
+    rows = grouped.sort_by([("bucket", "ascending"), (by, "ascending")]).to_pylist()
+    return [(row["bucket"], row[by], row["count_all"]) for row in rows]
+
+
+def budget_stats(skill: str | None = None, category: str | None = None, root: str = ARCHIVE_DIR,
+                 since: datetime | None = None, until: datetime | None = None) -> dict:
+    """
+    Median (and quartiles) of fixed-price budgets and of the top hourly
+    rate, over archived jobs with `skill` and/or in `category`.
+    """
+    table = load(root, since, until, columns=["skills", "category", "budget", "hourly_max"])
+    if category is not None:
+        table = table.filter(pc.equal(pc.cast(table["category"], pa.string()), category))
+    if skill is not None:
+        table = _with_skill(table, skill)
+
+    stats = {"jobs": table.num_rows}
+    for column in ("budget", "hourly_max"):
+        values = pc.drop_null(table[column])
+        if len(values):
+            q25, median, q75 = pc.quantile(values, q=[0.25, 0.5, 0.75]).to_pylist()
+            stats[column] = {"n": len(values), "p25": q25, "median": median, "p75": q75}
+        else:
+            stats[column] = {"n": 0}
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query the local job archive")
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--days", type=float, default=7, help="look back this many days")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    per = sub.add_parser("per", help="job counts per time bucket, e.g. per category per hour")
+    per.add_argument("--by", default="category")
+    per.add_argument("--unit", default="hour", choices=["minute", "hour", "day", "week", "month"])
+
+    budget = sub.add_parser("budget", help="median budget / hourly rate, e.g. for Flutter jobs")
+    budget.add_argument("--skill")
+    budget.add_argument("--category")
+
+    sub.add_parser("compact", help="merge each past day's part files into one")
+
+    args = parser.parse_args()
+    if pa is None:
+        sys.exit("The job archive needs pyarrow (pip install pyarrow)")
+    since = datetime.now(timezone.utc) - timedelta(days=args.days)
+
+    if args.command == "per":
+        for bucket, value, count in jobs_per(args.by, args.unit, args.root, since):
+            print(f"{bucket:%Y-%m-%d %H:%M}  {value or '-':30} {count}")
+    elif args.command == "budget":
+        stats = budget_stats(args.skill, args.category, args.root, since)
+        print(f"{stats['jobs']} jobs")
+        for column in ("budget", "hourly_max"):
+            s = stats[column]
+            if s["n"]:
+                print(f"{column:10} n={s['n']}  median ${s['median']:,.2f}  (p25 ${s['p25']:,.2f}, p75 ${s['p75']:,.2f})")
+            else:
+                print(f"{column:10} n=0")
+    else:
+        archive = JobArchive(args.root)
+        today = datetime.now(timezone.utc).date()
+        for directory in sorted(glob.glob(os.path.join(args.root, "date=*"))):
+            day = date.fromisoformat(os.path.basename(directory)[len("date="):])
+            if day < today:
+                print(f"{day}: {archive.compact(day)} parts")
@@ -0,0 +1,101 @@
+import os
+import math
+import mmap
+import struct
+import hashlib
+
+
+BLOOM_FILE = os.getenv("BLOOM_FILE", "seen.bloom")
+BLOOM_CAPACITY = int(os.getenv("BLOOM_CAPACITY", "5000000"))
+BLOOM_FP_RATE = float(os.getenv("BLOOM_FP_RATE", "0.001"))
+
+_MAGIC = b"UWBLOOM1"
+# magic, bit count, hash count, items added
+_HEADER = struct.Struct("<8sQII")
+
+
+def bloom_size(capacity: int, fp_rate: float) -> tuple[int, int]:
+    """Optimal (bits, hashes) for `capacity` items at `fp_rate`."""
+    bits = math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """
+    Bloom filter whose bit array lives in a memory-mapped file.
+
+    Adding an id only flips bits in the mapping, so the snapshot on disk is
+    always current (call flush() to force it out) and start-up is just an
+    mmap of the file. Nothing is replayed. A "no" answer is exact;
+    a "yes" is wrong with probability ~fp_rate while the filter holds no
+    more than `capacity` ids.
+    """
+
+    def __init__(self, path: str = BLOOM_FILE, capacity: int = BLOOM_CAPACITY,
+                 fp_rate: float = BLOOM_FP_RATE):
+        self.path = path
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+
+        if not os.path.exists(path):
+            bits, hashes = bloom_size(capacity, fp_rate)
+            with open(path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, bits, hashes, 0))
+                f.truncate(_HEADER.size + (bits + 7) // 8)
+
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+        magic, self.bits, self.hashes, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a bloom filter snapshot")
+
+    def _positions(self, key: str):
+        # Kirsch-Mitzenmacher double hashing off one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def __contains__(self, key: str) -> bool:
+        mm = self._mm
+        base = _HEADER.size
+        for pos in self._positions(key):
+            if not mm[base + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, key: str) -> bool:
+        """Adds `key`; returns True if it was (probably) not present before."""
+        mm = self._mm
+        base = _HEADER.size
+        added = False
+        for pos in self._positions(key):
+            index = base + (pos >> 3)
+            bit = 1 << (pos & 7)
+            byte = mm[index]
+            if not byte & bit:
+                mm[index] = byte | bit
+                added = True
+
+        if added:
+            self.count += 1
+            _HEADER.pack_into(mm, 0, _MAGIC, self.bits, self.hashes, self.count)
+        return added
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._mm)
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
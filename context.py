@@ -0,0 +1,120 @@
+import os
+import asyncio
+import functools
+
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1lqSgbqWif-iyyL6KEOunCI7TaCGgIVC7P3__btNmjIE/edit?usp=sharing"
+SHEETS_SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+
+class AppContext:
+    """
+    The Google Sheets, Telegram and rules clients a monitor needs.
+
+    Nothing is opened when the context is created. Each client is built
+    the first time it is used. The blocking Sheets calls run on `executor`,
+    and independent ones run concurrently: worksheets are opened and their
+    headers checked in parallel once the spreadsheet is open. So importing
+    app.py or mail.py does no network I/O, and the parsing and rules
+    modules never need credentials.
+    """
+
+    def __init__(self, rules_file: str | None = None, sheet_url: str = SHEET_URL,
+                 credentials_path: str | None = None, telegram_token: str | None = None, executor=None):
+        self.rules_file = rules_file
+        self.sheet_url = sheet_url
+        self.credentials_path = credentials_path
+        self.telegram_token = telegram_token
+        self.executor = executor
+        self._rules = None
+        self._bot = None
+        self._dispatcher = None
+        self._tasks: dict = {}
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    async def _once(self, key, make):
+        """
+        Result of make(), run once per key; concurrent callers share it.
+        A failure is not cached, so the next call tries again.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(make())
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+            raise
+
+    # ------------ RULES ------------
+
+    @property
+    def rules(self):
+        if self._rules is None:
+            from rules import RULES_FILE, RuleEngine
+            self._rules = RuleEngine(self.rules_file or RULES_FILE)
+        return self._rules
+
+    # ------------ GOOGLE SHEETS ------------
+
+    def _open_spreadsheet(self):
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        path = self.credentials_path or os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH')
+        if not path:
+            raise ValueError("The Google Sheets credentials path is not set in the environment variables")
+        creds = ServiceAccountCredentials.from_json_keyfile_name(path, SHEETS_SCOPE)
+        return gspread.authorize(creds).open_by_url(self.sheet_url)
+
+    async def spreadsheet(self):
+        return await self._once("spreadsheet", lambda: self._run(self._open_spreadsheet))
+
+    async def worksheet(self, index: int, headers: list | None = None, title: str | None = None):
+        """
+        Worksheet `index` of the spreadsheet. When `title` is given, a missing
+        worksheet is created under that title. When `headers` is given, they
+        are written to an empty first row.
+        """
+        async def open_worksheet():
+            spreadsheet = await self.spreadsheet()
+            worksheet = await self._run(spreadsheet.get_worksheet, index)
+            if worksheet is None and title:
+                worksheet = await self._run(functools.partial(spreadsheet.add_worksheet, title=title, rows="100", cols="20"))
+            if worksheet is None:
+                raise ValueError(f"Worksheet {index} not found")
+            if headers and not await self._run(worksheet.row_values, 1):
+                await self._run(functools.partial(worksheet.insert_row, headers, index=1))
+            return worksheet
+
+        return await self._once(("worksheet", index), open_worksheet)
+
+    async def worksheets(self, indices, headers: dict | None = None, titles: dict | None = None) -> dict:
+        """Opens several worksheets concurrently; returns {index: worksheet}."""
+        indices = list(indices)
+        headers = headers or {}
+        titles = titles or {}
+        opened = await asyncio.gather(
+            *(self.worksheet(i, headers.get(i), titles.get(i)) for i in indices)
+        )
+        return dict(zip(indices, opened))
+
+    # ------------ TELEGRAM ------------
+
+    @property
+    def bot(self):
+        if self._bot is None:
+            from telegram import Bot
+            self._bot = Bot(token=self.telegram_token or os.getenv("TELEGRAM_TOKEN"))
+        return self._bot
+
+    @property
+    def dispatcher(self):
+        if self._dispatcher is None:
+            from dispatcher import TelegramDispatcher
+            self._dispatcher = TelegramDispatcher(self.bot)
+        return self._dispatcher
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from bloom import BloomFilter
+from records import job_id_from_url
+
+
+DEDUP_DB = os.getenv("DEDUP_DB", "dedup.sqlite3")
+DEDUP_CAPACITY = int(os.getenv("DEDUP_CAPACITY", "100000"))
+DEDUP_TTL_DAYS = float(os.getenv("DEDUP_TTL_DAYS", "30"))
+DEDUP_BLOOM = os.getenv("DEDUP_BLOOM", "0").lower() in ("1", "true", "yes")
+SEED_FILE = "project_urls.json"
+
+
+class DedupStore:
+    """
+    Seen-job set keyed on the stable "~02..." job id.
+
+    Lookups hit an in-memory OrderedDict (hash lookup + LRU order), bounded
+    by `capacity` and `ttl` seconds. New ids are written to SQLite on
+    flush(), and on start-up the most recent ids are loaded back, so a
+    restart does not re-send alerts. project_urls.json is merged in as seed
+    data the first time.
+
+    With a BloomFilter attached (DEDUP_BLOOM=1) ids are also remembered in
+    the filter, which keeps months of history in a fixed few MB after they
+    fall out of the exact window; a filter false positive suppresses a new
+    job with probability ~BLOOM_FP_RATE.
+    """
+
+    def __init__(self, path: str = DEDUP_DB, capacity: int = DEDUP_CAPACITY,
+                 ttl: float = DEDUP_TTL_DAYS * 86400, seed_file: str | None = SEED_FILE,
+                 bloom: BloomFilter | None = None, clock=time.time):
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.bloom = bloom
+        if bloom is None and DEDUP_BLOOM:
+            self.bloom = BloomFilter()
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self._unsaved: list[tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (job_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+        self._db.commit()
+
+        if seed_file and os.path.exists(seed_file) and self._is_empty():
+            self.seed_from_file(seed_file)
+        self._load()
+
+    def _is_empty(self) -> bool:
+        return self._db.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is None
+
+    def _load(self):
+        cutoff = self.clock() - self.ttl
+        with self._lock:
+            self._db.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT job_id, seen_at FROM seen ORDER BY seen_at DESC LIMIT ?", (self.capacity,)
+            ).fetchall()
+
+        for job_id, seen_at in reversed(rows):
+            self._seen[job_id] = seen_at
+
+    def seed_from_file(self, seed_file: str) -> int:
+        with open(seed_file, "r", encoding="utf-8") as f:
+            urls = json.load(f).get("urls", [])
+
+        now = self.clock()
+        job_ids = [job_id_from_url(url) for url in urls]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO seen (job_id, seen_at) VALUES (?, ?)",
+                [(job_id, now) for job_id in job_ids],
+            )
+            self._db.commit()
+
+        if self.bloom is not None:
+            for job_id in job_ids:
+                self.bloom.add(job_id)
+
+        print(f"Seeded dedup store with {len(urls)} URLs from {seed_file}")
+        return len(urls)
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __contains__(self, job_id: str) -> bool:
+        seen_at = self._seen.get(job_id)
+        if seen_at is None:
+            return False
+        if self.clock() - seen_at > self.ttl:
+            del self._seen[job_id]
+            return False
+        return True
+
+    def is_new(self, job_id: str) -> bool:
+        """True if `job_id` was not seen before; unlike add(), does not mark it."""
+        if job_id in self:
+            return False
+        return self.bloom is None or job_id not in self.bloom
+
+    def add(self, job_id: str) -> bool:
+        """
+        Marks `job_id` as seen. Returns True if it was not seen before.
+        """
+        is_new = job_id not in self
+        if self.bloom is not None:
+            is_new = self.bloom.add(job_id) and is_new
+        now = self.clock()
+
+        self._seen[job_id] = now
+        self._seen.move_to_end(job_id)
+        with self._lock:
+            self._unsaved.append((job_id, now))
+
+        while len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+        return is_new
+
+    def flush(self):
+        """Persists ids added since the last flush (blocking; run off the loop)."""
+        if self.bloom is not None:
+            self.bloom.flush()
+        with self._lock:
+            if not self._unsaved:
+                return
+            rows, self._unsaved = self._unsaved, []
+            self._db.executemany(
+                "INSERT INTO seen (job_id, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET seen_at = excluded.seen_at",
+                rows,
+            )
+            self._db.commit()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+        if self.bloom is not None:
+            self.bloom.close()
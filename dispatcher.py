@@ -0,0 +1,218 @@
+import os
+import time
+import asyncio
+from collections import deque
+from datetime import timedelta
+
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+from metrics import TELEGRAM_MESSAGES, TELEGRAM_QUEUE, TELEGRAM_SEND_TIME
+
+
+# Telegram Bot API limits: ~30 messages/s overall, ~1 message/s per chat
+# and 20 messages/minute per group chat.
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", str(20 / 60)))
+SENDERS = int(os.getenv("TELEGRAM_SENDERS", "4"))
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts of up to `capacity`.
+    Waiters are served in FIFO order.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Hands out no tokens for `seconds` (used for Telegram's retry_after)."""
+        self._paused_until = max(self._paused_until, self.clock() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self.clock()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    value = error.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class TelegramDispatcher:
+    """
+    Outbound Telegram queue with one FIFO lane per chat.
+
+    Lanes drain concurrently, so a slow or flood-limited chat never holds up
+    the others, while messages to the same chat keep their order. At most
+    `senders` requests are in flight at once. Every send passes a global and
+    a per-chat token bucket, RetryAfter pauses the affected chat for the
+    requested time before retrying, and network errors are retried with
+    backoff. send() returns a future that resolves to True once delivered,
+    or False when the message was given up on.
+    """
+
+    def __init__(self, bot, senders: int = SENDERS, global_rate: float = GLOBAL_RATE,
+                 chat_rate: float = CHAT_RATE, group_rate: float = GROUP_RATE,
+                 max_attempts: int = 5, latency_window: int = 1000):
+        self.bot = bot
+        self.senders = senders
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_attempts = max_attempts
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self._chat_buckets: dict[str, TokenBucket] = {}
+        self._lanes: dict[str, deque] = {}
+        self._lane_tasks: dict[str, asyncio.Task] = {}
+        self._slots = asyncio.Semaphore(senders)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._pending = 0
+        self._latencies = deque(maxlen=latency_window)
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            rate = self.group_rate if key.startswith("-") else self.chat_rate
+            bucket = self._chat_buckets[key] = TokenBucket(rate)
+        return bucket
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    async def send(self, chat_id, content: str) -> asyncio.Future:
+        key = str(chat_id)
+        delivered = asyncio.get_running_loop().create_future()
+        self._lanes.setdefault(key, deque()).append((chat_id, content, time.monotonic(), delivered))
+        self._pending += 1
+        TELEGRAM_QUEUE.set(self._pending)
+        self._idle.clear()
+
+        if key not in self._lane_tasks:
+            self._lane_tasks[key] = asyncio.create_task(self._drain(key))
+        return delivered
+
+    async def join(self):
+        """Waits until everything queued so far was sent or given up on."""
+        await self._idle.wait()
+
+    async def close(self):
+        await self.join()
+        tasks = list(self._lane_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _drain(self, key: str):
+        lane = self._lanes[key]
+        try:
+            while lane:
+                chat_id, content, queued_at, delivered = lane.popleft()
+                ok = await self._deliver(chat_id, content)
+                if ok:
+                    self.sent += 1
+                    self._latencies.append(time.monotonic() - queued_at)
+                    TELEGRAM_SEND_TIME.observe(time.monotonic() - queued_at)
+                    TELEGRAM_MESSAGES.inc(result="sent")
+                else:
+                    self.failed += 1
+                    TELEGRAM_MESSAGES.inc(result="failed")
+                if not delivered.done():
+                    delivered.set_result(ok)
+
+                self._pending -= 1
+                TELEGRAM_QUEUE.set(self._pending)
+                if not self._pending:
+                    self._idle.set()
+        finally:
+            del self._lane_tasks[key]
+            if not lane:
+                del self._lanes[key]
+
+    async def _deliver(self, chat_id, content: str) -> bool:
+        bucket = self._bucket(chat_id)
+
+        for attempt in range(1, self.max_attempts + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                async with self._slots:
+                    await self.bot.send_message(chat_id=chat_id, text=content)
+                return True
+            except RetryAfter as e:
+                wait = _retry_after_seconds(e)
+                print(f"Telegram flood limit, retrying in {wait:.0f}s")
+                bucket.pause(wait)
+            except (TimedOut, NetworkError) as e:
+                if attempt == self.max_attempts:
+                    print(f"Failed to send message: {e}")
+                    return False
+                await asyncio.sleep(min(2 ** attempt, 30))
+            except Exception as e:
+                print(f"Failed to send message: {e}")
+                return False
+            self.retries += 1
+            TELEGRAM_MESSAGES.inc(result="retry")
+
+        print("Failed to send message: too many retries")
+        return False
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def pct(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "queue_depth": self._pending,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "latency_p50": pct(0.50),
+            "latency_p95": pct(0.95),
+            "latency_max": latencies[-1] if latencies else 0.0,
+        }
+
+
+class MemoryDispatcher:
+    """
+    Stand-in for TelegramDispatcher that records messages instead of
+    sending them, for tests and benchmarks.
+    """
+
+    def __init__(self):
+        self.messages: list[tuple] = []
+
+    async def send(self, chat_id, content):
+        self.messages.append((chat_id, content))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(True)
+        return future
@@ -0,0 +1,198 @@
+import re
+import sys
+import random
+import argparse
+from dataclasses import dataclass
+
+
+_MONEY_RE = re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)\s*([KkMm]?)")
+_SUFFIX = {"": 1, "k": 1_000, "m": 1_000_000}
+
+# Details column: "Hourly: $15.00 - $40.00 | Intermediate | Est. time: ..."
+#                 "Fixed price | Expert | Est. budget: $1,500.00 | ..."
+_JOB_TYPE_RE = re.compile(r"\b(hourly|fixed[- ]price)\b", re.IGNORECASE)
+_HOURLY_RE = re.compile(r"\bhourly\b:?\s*([^|]*)", re.IGNORECASE)
+_BUDGET_RE = re.compile(r"\bbudget\b:?\s*([^|]*)", re.IGNORECASE)
+_EXPERIENCE_RE = re.compile(r"\b(entry|intermediate|expert)\b", re.IGNORECASE)
+
+
+def parse_money(text: str) -> list[float]:
+    """
+    All dollar amounts in `text`: "$1,500.00" -> 1500.0, "$10K+" -> 10000.0.
+    """
+    return [
+        float(number.replace(",", "")) * _SUFFIX[suffix.lower()]
+        for number, suffix in _MONEY_RE.findall(text or "")
+    ]
+
+
+@dataclass(frozen=True, slots=True)
+class JobTerms:
+    """
+    Typed job terms; every field is None when the tile does not state it.
+    """
+    job_type: str | None = None        # "hourly" | "fixed"
+    experience: str | None = None      # "entry" | "intermediate" | "expert"
+    budget: float | None = None        # fixed-price budget
+    hourly_min: float | None = None
+    hourly_max: float | None = None
+    total_spent_value: float | None = None
+
+
+def extract_terms(details: str, total_spent: str = "") -> JobTerms:
+    """
+    Parses the Details text (job type | experience | budget | duration) and
+    the Total Spent text of a job once. Never raises on odd formats; a part
+    it cannot read stays None.
+    """
+    details = details or ""
+
+    job_type = None
+    match = _JOB_TYPE_RE.search(details)
+    if match:
+        job_type = "hourly" if match.group(1).lower() == "hourly" else "fixed"
+
+    match = _EXPERIENCE_RE.search(details)
+    experience = match.group(1).lower() if match else None
+
+    match = _BUDGET_RE.search(details)
+    budget_amounts = parse_money(match.group(1)) if match else []
+
+    budget = None
+    hourly = []
+    if job_type == "hourly":
+        match = _HOURLY_RE.search(details)
+        # The rate sits in the job type ("Hourly: $15.00 - $40.00") or, on
+        # older tiles, in the budget part
+        hourly = (parse_money(match.group(1)) if match else []) or budget_amounts
+    elif budget_amounts:
+        budget = budget_amounts[-1]
+
+    spent = parse_money(total_spent)
+
+    return JobTerms(
+        job_type=job_type,
+        experience=experience,
+        budget=budget,
+        hourly_min=min(hourly) if hourly else None,
+        hourly_max=max(hourly) if hourly else None,
+        total_spent_value=spent[0] if spent else None,
+    )
+
+
+# ------------ GENERATED CORPUS CHECK ------------
+
+def _money_text(value: float, rnd: random.Random) -> str:
+    """A dollar amount the way Upwork may print it."""
+    if value >= 1_000_000 and value % 1_000_000 == 0 and rnd.random() < 0.7:
+        return f"${value / 1_000_000:g}M" + rnd.choice(["", "+"])
+    if value >= 1_000 and value % 1_000 == 0 and rnd.random() < 0.7:
+        return f"${value / 1_000:g}{rnd.choice('Kk')}" + rnd.choice(["", "+"])
+    if value.is_integer() and rnd.random() < 0.3:
+        return f"${value:,.0f}"
+    return rnd.choice([f"${value:,.2f}", f"${value:.2f}", f"$ {value:,.2f}"])
+
+
+def _random_amount(rnd: random.Random) -> float:
+    return rnd.choice([
+        float(rnd.randint(0, 999)),
+        float(rnd.randint(1, 99) * 1_000),
+        float(rnd.randint(1, 9) * 1_000_000),
+        rnd.randint(500, 9999) / 100,
+    ])
+
+
+def random_case(rnd: random.Random) -> tuple[str, str, JobTerms]:
+    """One generated (details, total_spent, expected terms) case."""
+    parts = []
+    expected = {}
+
+    kind = rnd.choice(["hourly", "fixed", None])
+    if kind == "hourly":
+        low = _random_amount(rnd)
+        high = max(low, _random_amount(rnd))
+        rate = rnd.choice([f"{_money_text(low, rnd)} - {_money_text(high, rnd)}", _money_text(low, rnd)])
+        if rate.count("$") == 1:
+            high = low
+        if rnd.random() < 0.5:
+            parts.append(f"Hourly: {rate}")
+        else:
+            parts.append("Hourly")
+            parts.append(f"Est. budget: {rate}")
+        expected.update(job_type="hourly", hourly_min=low, hourly_max=high)
+    elif kind == "fixed":
+        parts.append(rnd.choice(["Fixed price", "Fixed-price"]))
+        expected["job_type"] = "fixed"
+        if rnd.random() < 0.8:
+            budget = _random_amount(rnd)
+            parts.append(f"Est. budget: {_money_text(budget, rnd)}")
+            expected["budget"] = budget
+
+    if rnd.random() < 0.8:
+        level = rnd.choice(["entry", "intermediate", "expert"])
+        parts.insert(1, {"entry": "Entry level"}.get(level, level.title()))
+        expected["experience"] = level
+
+    if rnd.random() < 0.7:
+        parts.append(rnd.choice(["Est. time: 1 to 3 months", "Est. time: Less than 1 month, 30+ hrs/week"]))
+    if rnd.random() < 0.1:
+        rnd.shuffle(parts)
+
+    if rnd.random() < 0.8:
+        spent = _random_amount(rnd)
+        total_spent = f"{_money_text(spent, rnd)} spent"
+        expected["total_spent_value"] = spent
+    else:
+        total_spent = rnd.choice(["No spent", "", "None"])
+
+    return " | ".join(parts), total_spent, JobTerms(**expected)
+
+
+def _close(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, str):
+        return a == b
+    return abs(a - b) <= 0.005 * max(1.0, abs(b))
+
+
+def check_corpus(cases: int = 10_000, seed: int = 0) -> int:
+    """
+    Runs extract_terms over generated Details/Total Spent strings and
+    prints the cases whose terms differ from what was generated. Also feeds
+    it random mangled text, which must not raise. Returns the number of
+    failures.
+    """
+    rnd = random.Random(seed)
+    failures = 0
+    for _ in range(cases):
+        details, total_spent, expected = random_case(rnd)
+        got = extract_terms(details, total_spent)
+        if not all(_close(getattr(got, f), getattr(expected, f)) for f in JobTerms.__slots__):
+            failures += 1
+            if failures <= 10:
+                print(f"MISMATCH {details!r} / {total_spent!r}\n  got      {got}\n  expected {expected}")
+
+        # Garbage in: truncated / shuffled characters
+        mangled = list(details)
+        if rnd.random() < 0.5:
+            rnd.shuffle(mangled)
+        extract_terms("".join(mangled[:rnd.randint(0, len(mangled))]), total_spent[::-1])
+
+    # Bare punctuation after a dollar sign is not an amount
+    for text in ("$,", "$,,", "$.", "$,.5", "Est. budget: $,", "Hourly: $, - $,"):
+        if parse_money(text):
+            failures += 1
+            print(f"MISMATCH parse_money({text!r}) = {parse_money(text)}, expected []")
+        extract_terms(text, text)
+
+    print(f"{cases} generated cases, {failures} mismatches")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check extract_terms against a generated corpus")
+    parser.add_argument("--cases", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(1 if check_corpus(args.cases, args.seed) else 0)
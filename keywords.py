@@ -0,0 +1,156 @@
+import re
+
+try:
+    import ahocorasick
+except ImportError:  # optional C accelerator, see KeywordMatcher
+    ahocorasick = None
+
+
+# ------------ MATCHER ------------
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum()
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword of every group in one pass over the text.
+
+    With pyahocorasick installed the keywords are compiled into an
+    Aho-Corasick automaton that reports every (overlapping) occurrence in a
+    single scan. Without it they are compiled into one trie-shaped regular
+    expression run by the C regex engine at each position of the text.
+    Either way the cost does not grow with the number of keywords the way
+    `kw in text` per keyword does.
+
+    Matching is on word boundaries: "ai" no longer hits "email" and "ui" no
+    longer hits "build". A keyword edge that is punctuation ("c#", ".net
+    core") needs no boundary, a trailing "s"/"es" plural is accepted, and a
+    keyword ending in "*" ("automat*") matches as a prefix.
+    Text is expected to be lower-case already.
+    """
+
+    def __init__(self, groups: dict[str, list[str]]):
+        self.groups = {name: list(keywords) for name, keywords in groups.items()}
+
+        # keyword -> groups it belongs to, prefix keywords stored without "*"
+        self._groups_of: dict[str, list[str]] = {}
+        self._prefix: set[str] = set()
+        for name, keywords in groups.items():
+            for kw in keywords:
+                kw = kw.lower()
+                if kw.endswith("*"):
+                    kw = kw[:-1]
+                    self._prefix.add(kw)
+                self._groups_of.setdefault(kw, [])
+                if name not in self._groups_of[kw]:
+                    self._groups_of[kw].append(name)
+
+        # Shorter keywords that also match wherever a longer one starts
+        self._implied = {kw: self._prefixes_of(kw) for kw in self._groups_of}
+        self._pattern = self._compile()
+
+        self._automaton = None
+        if ahocorasick is not None and self._groups_of:
+            self._automaton = ahocorasick.Automaton()
+            for kw in self._groups_of:
+                self._automaton.add_word(kw, kw)
+            self._automaton.make_automaton()
+
+    def _ends_word(self, kw: str, rest: str) -> bool:
+        """Would `kw` match when followed by `rest`?"""
+        if kw in self._prefix or not _is_word_char(kw[-1]) or not _is_word_char(rest[0]):
+            return True
+        for plural in ("s", "es"):
+            if rest.startswith(plural) and not _is_word_char(rest[len(plural):len(plural) + 1] or " "):
+                return True
+        return False
+
+    def _prefixes_of(self, kw: str) -> list[str]:
+        return [
+            other for other in self._groups_of
+            if other != kw and kw.startswith(other) and self._ends_word(other, kw[len(other):])
+        ]
+
+    def _compile(self):
+        word_start, other_start = {}, {}
+        for kw in self._groups_of:
+            trie = word_start if _is_word_char(kw[0]) else other_start
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[""] = kw
+
+        parts = []
+        if word_start:
+            parts.append(r"(?<![^\W_])" + self._trie_regex(word_start))
+        if other_start:
+            parts.append(self._trie_regex(other_start))
+        return re.compile(r"(?=(" + "|".join(parts) + "))")
+
+    def _trie_regex(self, node: dict) -> str:
+        alts = [
+            re.escape(ch) + self._trie_regex(child)
+            for ch, child in sorted(node.items())
+            if ch
+        ]
+
+        if "" in node:
+            kw = node[""]
+            if kw in self._prefix or not _is_word_char(kw[-1]):
+                end = ""
+            else:
+                end = r"(?:e?s)?(?![^\W_])"
+            alts.append(end)
+
+        if len(alts) == 1:
+            return alts[0]
+        return "(?:" + "|".join(alts) + ")"
+
+    def _keyword_for(self, matched: str) -> str | None:
+        if matched in self._groups_of:
+            return matched
+        for cut in (1, 2):
+            kw = matched[:-cut]
+            if kw in self._groups_of:
+                return kw
+        return None
+
+    def _scan_regex(self, text: str):
+        for m in self._pattern.finditer(text):
+            kw = self._keyword_for(m.group(1))
+            if kw is None:
+                continue
+            yield kw
+            yield from self._implied[kw]
+
+    def _scan_automaton(self, text: str):
+        size = len(text)
+        for end, kw in self._automaton.iter(text):
+            start = end - len(kw) + 1
+            if start and _is_word_char(kw[0]) and _is_word_char(text[start - 1]):
+                continue
+
+            after = end + 1
+            if after < size and kw not in self._prefix and _is_word_char(kw[-1]) \
+                    and _is_word_char(text[after]):
+                rest = text[after:after + 3]
+                if not self._ends_word(kw, rest + " "):
+                    continue
+            yield kw
+
+    def hits(self, text: str) -> dict[str, set[str]]:
+        """group -> distinct keywords of that group found in `text`."""
+        found = {name: set() for name in self.groups}
+        groups_of = self._groups_of
+        if not groups_of:
+            return found
+
+        scan = self._scan_automaton if self._automaton is not None else self._scan_regex
+        for kw in scan(text):
+            for name in groups_of[kw]:
+                found[name].add(kw)
+        return found
+
+    def counts(self, text: str) -> dict[str, int]:
+        return {name: len(kws) for name, kws in self.hits(text).items()}
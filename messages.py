@@ -0,0 +1,69 @@
+# ------------ TELEGRAM MESSAGE FORMAT ------------
+
+def format_message(record, match=None, scores: dict | None = None, repost: tuple | None = None):
+    """
+    Formats the project details into a Telegram message string.
+    - Wraps the title in the markers of matched highlights (🔥 for embedded).
+    - Adds the best-scoring profile when a scoring model is trained.
+    - Points to the earlier job when this one looks like a repost.
+    - Places Description AFTER Total Spent.
+    """
+
+    title = record.title or ""
+    description = record.description or ""
+    skills = record.skills or ""
+
+    for marker in (match.markers if match is not None else ()):
+        title = f"{marker} {title} {marker}"
+
+    notes = ""
+    if scores:
+        profile = max(scores, key=scores.get)
+        notes = f"Relevance: {profile} {scores[profile]:.0%}\n"
+
+    if repost:
+        url, similarity = repost
+        title = f"♻️ {title}"
+        notes += f"Possible repost ({similarity:.0%} similar) of:\n{url}\n"
+
+    return (
+        f"{title}\n\n"
+        f"Posted: {record.posted_time}\n"
+        f"Details: {record.details}\n"
+        f"Location: {record.location}\n"
+        f"Total Spent: {record.total_spent}\n"
+        f"{notes}\n"
+        f"Description:\n{description}\n\n"
+        f"Project URL:\n{record.url}\n\n"
+        f"Skills:\n{skills}"
+    )
+
+
+def format_search_results(query: str, total: int, records) -> str:
+    """
+    Reply to /find: the match count and one short entry per job, newest
+    first, kept under Telegram's 4096-character limit.
+    """
+    if not total:
+        return f"No recent jobs match: {query}"
+
+    header = f"{total} recent jobs match: {query}"
+    if total > len(records):
+        header += f" (newest {len(records)})"
+
+    entries = []
+    for record in records:
+        if record.job_type == "hourly" and record.hourly_max is not None:
+            price = f"${record.hourly_min:,.0f}-${record.hourly_max:,.0f}/h"
+        elif record.budget is not None:
+            price = f"${record.budget:,.0f}"
+        else:
+            price = "no budget"
+        entries.append(f"• {record.title}\n{price} | {record.location} | {record.posted_time}\n{record.url}")
+
+    text = header
+    for entry in entries:
+        if len(text) + len(entry) + 2 > 4000:
+            break
+        text += "\n\n" + entry
+    return text
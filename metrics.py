@@ -0,0 +1,192 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+
+
+# Endpoint used when METRICS_PORT / METRICS_HOST are not set; port 0 turns it off
+DEFAULT_METRICS_PORT = 9108
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    """Label value escaped as the text format requires: backslash, quote, newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: tuple) -> str:
+    if not labels:
+        return ""
+    parts = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + parts + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally split by labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def _samples(self):
+        return [f"{self.name}_total{_label_text(k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Current value of something that goes up and down."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def _samples(self):
+        return [f"{self.name} {self._value}"]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values (seconds by convention)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # labels -> [bucket counts..., sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[-1] if series else 0
+
+    def _samples(self):
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_label_text(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_label_text(key)} {series[-1]}")
+        return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------ HOT PATH METRICS ------------
+
+SNAPSHOTS = Counter("upwork_snapshots", "Snapshot files processed")
+SNAPSHOT_WAIT = Histogram("upwork_snapshot_wait_seconds", "File saved (mtime) to picked up for parsing")
+PARSE_TIME = Histogram("upwork_parse_seconds", "Parsing one snapshot, including time queued for a parser")
+JOBS = Counter("upwork_jobs", "Parsed job records, by outcome (new / seen)")
+DEDUP_TIME = Histogram("upwork_dedup_seconds", "Dedup lookups for one snapshot")
+RULE_HITS = Counter("upwork_rule_hits", "Jobs per matched category, highlight and route (kind, name)")
+CATEGORIZE_TIME = Histogram("upwork_categorize_seconds", "Scoring, rules and repost checks for one snapshot")
+SINK_FLUSH_TIME = Histogram("upwork_sink_flush_seconds", "Writing one sink's batch (sheet write, Telegram enqueue, file)")
+SINK_FAILURES = Counter("upwork_sink_failures", "Sink flushes that failed")
+OUTBOX_BACKLOG = Gauge("upwork_outbox_backlog", "Routed jobs waiting in the outbox for a sink")
+TELEGRAM_SEND_TIME = Histogram("upwork_telegram_send_seconds", "Message queued to accepted by Telegram")
+TELEGRAM_QUEUE = Gauge("upwork_telegram_queue_depth", "Telegram messages queued or in flight")
+TELEGRAM_MESSAGES = Counter("upwork_telegram_messages", "Telegram messages by result (sent / failed / retry)")
+ALERT_LATENCY = Histogram("upwork_alert_latency_seconds", "File saved to Telegram alert delivered")
+
+
+# ------------ HTTP ENDPOINT ------------
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+        path = request.split(b" ", 2)[1].decode("latin-1") if request.count(b" ") >= 2 else ""
+        if path.split("?")[0] in ("/", "/metrics"):
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(port: int | None = None, host: str | None = None):
+    """
+    Starts the /metrics endpoint (METRICS_PORT, METRICS_HOST); returns the
+    server, or None if it is turned off or the port is taken.
+    """
+    if port is None:
+        port = int(os.getenv("METRICS_PORT", DEFAULT_METRICS_PORT))
+    host = host or os.getenv("METRICS_HOST") or DEFAULT_METRICS_HOST
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(_handle, host, port)
+    except OSError as e:
+        print(f"Metrics endpoint not started: {e}")
+        return None
+    print(f"Metrics on http://{host}:{port}/metrics")
+    return server
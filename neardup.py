@@ -0,0 +1,136 @@
+import os
+import re
+import zlib
+from collections import deque
+
+import numpy as np
+
+
+NEARDUP_MODE = os.getenv("NEARDUP_MODE", "flag").lower()  # flag | suppress | off
+NEARDUP_THRESHOLD = float(os.getenv("NEARDUP_THRESHOLD", "0.7"))
+NEARDUP_WINDOW = int(os.getenv("NEARDUP_WINDOW", "5000"))
+# Shorter texts (an empty description plus a few skills) look identical
+# to each other, so they are neither checked nor indexed
+NEARDUP_MIN_SHINGLES = int(os.getenv("NEARDUP_MIN_SHINGLES", "10"))
+
+SHINGLE_WORDS = 3
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """crc32 of every k-word shingle of `text`, deduplicated."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+def repost_text(record) -> str:
+    """What a repost keeps: the title gets tweaked, description and skills rarely do."""
+    return f"{record.description} {record.skills}"
+
+
+class NearDupIndex:
+    """
+    MinHash signatures over word shingles, with an LSH index over the most
+    recent `window` jobs.
+
+    Each of the `num_perm` hash functions is a multiply-shift hash, and a
+    signature keeps each one's minimum over the job's shingles. Two jobs agree on a
+    signature slot with probability equal to their Jaccard similarity. The
+    signature is cut into `bands` bands; jobs sharing any whole band become
+    candidates, so a check touches a handful of buckets instead of every
+    job in the window. Candidates are confirmed against `threshold` using
+    the signature agreement. Texts with fewer than `min_shingles`
+    shingles get no signature and are never reported as reposts.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, threshold: float = NEARDUP_THRESHOLD,
+                 window: int = NEARDUP_WINDOW, min_shingles: int = NEARDUP_MIN_SHINGLES, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.window = window
+        self.min_shingles = max(1, min_shingles)
+
+        rnd = np.random.default_rng(seed)
+        self._a = rnd.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rnd.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+        self._buckets: dict[tuple[int, bytes], set] = {}
+        self._entries: dict = {}  # key -> (signature, payload)
+        self._order = deque()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signature(self, text: str) -> np.ndarray | None:
+        values = shingles(text)
+        if len(values) < self.min_shingles:
+            return None
+        hashed = (values[:, None] * self._a + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def query(self, signature: np.ndarray, exclude=None):
+        """
+        (payload, similarity) of the closest indexed job above threshold, or
+        None. The job indexed under `exclude` (the one being checked) never matches.
+        """
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        candidates.discard(exclude)
+
+        best, best_sim = None, self.threshold
+        for key in candidates:
+            other, payload = self._entries[key]
+            sim = float(np.count_nonzero(other == signature)) / self.num_perm
+            if sim >= best_sim:
+                best, best_sim = payload, sim
+        return None if best is None else (best, best_sim)
+
+    def add(self, key, signature: np.ndarray, payload=None):
+        if key in self._entries:
+            return
+        self._entries[key] = (signature, key if payload is None else payload)
+        self._order.append(key)
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+        while len(self._order) > self.window:
+            self._evict(self._order.popleft())
+
+    def discard(self, key):
+        """Forgets `key`, e.g. when the shared RecentJobs buffer evicts the job."""
+        if key in self._entries:
+            self._order.remove(key)
+            self._evict(key)
+
+    def _evict(self, key):
+        signature, _ = self._entries.pop(key)
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def check(self, key, text: str, payload=None):
+        """
+        Looks `text` up among recent jobs, then indexes it under `key`.
+        Returns (payload of the earlier job, similarity) for a repost, else None.
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        match = self.query(signature, exclude=key)
+        self.add(key, signature, payload)
+        return match
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+OUTBOX_DB = os.getenv("OUTBOX_DB", "outbox.sqlite3")  # empty turns the outbox off
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "200"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "20"))
+
+
+class Outbox:
+    """
+    Write-ahead log of routed jobs, one entry per (sink, job).
+
+    The router put()s each rendered sheet row / message / line and
+    commit()s them in one transaction before the snapshot is deleted. Sink
+    workers then read pending() entries, deliver them, and ack() what the
+    sink accepted. An entry leaves the outbox only when its own sink acks
+    it, so a crash or an outage means re-delivery (at least once), never
+    loss. After `max_attempts` failed deliveries an entry is parked. It
+    stays in the table but is no longer handed out.
+    """
+
+    def __init__(self, path: str = OUTBOX_DB, max_attempts: int = OUTBOX_MAX_ATTEMPTS, clock=time.time):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._unsaved: list[tuple[str, str, float]] = []
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " sink TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_sink ON entries (sink, attempts, id)")
+        self._db.commit()
+
+    def put(self, sink: str, payload):
+        """Buffers an entry for `sink`; durable after the next commit()."""
+        with self._lock:
+            self._unsaved.append((sink, json.dumps(payload, ensure_ascii=False), self.clock()))
+
+    def commit(self) -> int:
+        """Writes the buffered entries in one transaction (blocking); returns how many."""
+        with self._lock:
+            if not self._unsaved:
+                return 0
+            rows, self._unsaved = self._unsaved, []
+            try:
+                self._db.executemany("INSERT INTO entries (sink, payload, created_at) VALUES (?, ?, ?)", rows)
+                self._db.commit()
+            except Exception:
+                # Kept for the next commit(), nothing routed is dropped
+                self._db.rollback()
+                self._unsaved = rows + self._unsaved
+                raise
+        return len(rows)
+
+    def pending(self, sink: str, limit: int = OUTBOX_BATCH) -> list[tuple[int, object]]:
+        """Oldest undelivered (id, payload) entries for `sink`."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, payload FROM entries WHERE sink = ? AND attempts < ? ORDER BY id LIMIT ?",
+                (sink, self.max_attempts, limit),
+            ).fetchall()
+        return [(entry_id, json.loads(payload)) for entry_id, payload in rows]
+
+    def ack(self, ids: list[int]):
+        """Removes delivered entries."""
+        if not ids:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM entries WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def failed(self, ids: list[int]) -> int:
+        """Counts a failed attempt on each entry; returns how many got parked by it."""
+        if not ids:
+            return 0
+        with self._lock:
+            self._db.executemany("UPDATE entries SET attempts = attempts + 1 WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+            marks = ",".join("?" * len(ids))
+            parked = self._db.execute(
+                f"SELECT COUNT(*) FROM entries WHERE id IN ({marks}) AND attempts >= ?", (*ids, self.max_attempts)
+            ).fetchone()[0]
+        return parked
+
+    def backlog(self) -> dict[str, int]:
+        """Undelivered entries per sink, parked ones excluded."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sink, COUNT(*) FROM entries WHERE attempts < ? GROUP BY sink", (self.max_attempts,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        self.commit()
+        self._db.close()
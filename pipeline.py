@@ -0,0 +1,101 @@
+import time
+import asyncio
+
+from metrics import CATEGORIZE_TIME, DEDUP_TIME, JOBS
+from neardup import NEARDUP_MODE, repost_text
+from scoring import score_batch
+
+
+class Pipeline:
+    """
+    What the monitor does with the records of one snapshot: dedup, scoring,
+    rules, repost check, fan-out through the router, the local job archive
+    and the buffer of recent jobs (which feeds the /find index).
+
+    All collaborators are passed in, so the same code runs against the real
+    Sheets/Telegram sinks in app.py and against in-memory fakes in
+    benchmark.py.
+    """
+
+    def __init__(self, rules, dedup, router, run_blocking, reposts=None, neardup_mode: str = NEARDUP_MODE,
+                 archive=None, recent=None):
+        self.rules = rules
+        self.dedup = dedup
+        self.router = router
+        self.run_blocking = run_blocking
+        self.reposts = reposts
+        self.neardup_mode = neardup_mode
+        self.archive = archive
+        self.recent = recent
+
+    def _accept(self, records, routed):
+        """
+        Side effects that must only happen once the routed jobs are safe:
+        dedup, archive, the recent-jobs buffer and rule hit counts. A failed
+        snapshot then meets none of its own state when it is retried.
+        """
+        for record in records:
+            self.dedup.add(record.job_id)
+        for record, match in routed:
+            self.rules.count(match)
+            if self.archive is not None:
+                self.archive.add(record, match.category)
+            if self.recent is not None:
+                self.recent.append(record)
+
+    async def process(self, records, saved_at: float | None = None) -> int:
+        """
+        Routes the new records and flushes every sink; returns how many were
+        new. `saved_at` (epoch seconds the snapshot was written) feeds the
+        file-saved-to-alert-delivered latency histogram.
+        """
+        self.rules.maybe_reload()
+
+        # Ids are only looked up here and marked seen once the jobs are
+        # routed (with an outbox: committed), so a failed snapshot can be retried
+        with DEDUP_TIME.time():
+            new_records = []
+            new_ids = set()
+            for record in records:
+                if record.job_id not in new_ids and self.dedup.is_new(record.job_id):
+                    new_ids.add(record.job_id)
+                    new_records.append(record)
+        JOBS.inc(len(new_records), outcome="new")
+        JOBS.inc(len(records) - len(new_records), outcome="seen")
+
+        categorize_start = time.perf_counter()
+        scores = await self.run_blocking(score_batch, new_records) or [None] * len(new_records)
+
+        routed = []
+        for record, score in zip(new_records, scores):
+            match = self.rules.evaluate(record, count=False)
+
+            # --- REPOSTS OF A RECENT JOB UNDER A NEW URL ---
+            repost = None
+            if self.reposts is not None:
+                repost = self.reposts.check(record.job_id, repost_text(record), record.url)
+                if repost:
+                    print(f"Repost of {repost[0]} ({repost[1]:.0%} similar): {record.url}")
+
+            # NEARDUP_MODE=suppress keeps reposts out of Telegram only
+            exclude = {"telegram"} if repost and self.neardup_mode == "suppress" else set()
+            self.router.route(record, match, exclude, scores=score, repost=repost, saved_at=saved_at)
+            routed.append((record, match))
+        CATEGORIZE_TIME.observe(time.perf_counter() - categorize_start)
+
+        if self.router.outbox is not None:
+            # The routed jobs are in the outbox before they count as seen and
+            # before the snapshot is deleted; sink workers deliver them
+            await self.router.flush()
+            self._accept(records, routed)
+            await self.run_blocking(self.dedup.flush)
+        else:
+            # Every sink writes its batch concurrently, overlapping with
+            # parsing of the next snapshot; a failing sink does not block the rest
+            self._accept(records, routed)
+            await asyncio.gather(self.router.flush(), self.run_blocking(self.dedup.flush))
+
+        # The archive writes a file per few hundred jobs, not per snapshot
+        if self.archive is not None and self.archive.due():
+            await self.run_blocking(self.archive.flush)
+        return len(new_records)
@@ -0,0 +1,206 @@
+import os
+import time
+import zlib
+
+from records import JobRecord
+
+
+RECENT_JOBS = int(os.getenv("RECENT_JOBS", "20000"))
+RECENT_COMPRESS = os.getenv("RECENT_COMPRESS", "1").lower() in ("1", "true", "yes")
+
+# Fields that repeat across jobs; every job holds the one shared copy
+INTERNED_FIELDS = ("posted_ago", "posted_time", "total_spent", "location", "details",
+                   "payment_status", "job_type", "experience")
+_FIELDS = JobRecord.__slots__
+_INTERNED = tuple(_FIELDS.index(name) for name in INTERNED_FIELDS)
+_SKILLS = _FIELDS.index("skills")
+_DESCRIPTION = _FIELDS.index("description")
+
+
+class Interner:
+    """
+    One shared copy of each repeated string ("United States", "React",
+    "Payment verified"), counted by its users. intern() returns the
+    shared copy, release() gives it back. A string no job uses any more
+    is dropped, so the table only holds what the buffer holds.
+    """
+
+    def __init__(self):
+        self._table: dict[str, list] = {}  # value -> [value, users]
+
+    def __len__(self):
+        return len(self._table)
+
+    def intern(self, value: str | None) -> str | None:
+        if value is None:
+            return None
+        entry = self._table.get(value)
+        if entry is None:
+            entry = self._table[value] = [value, 0]
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, value: str | None):
+        if value is None:
+            return
+        entry = self._table[value]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._table[value]
+
+
+class RecentJobs:
+    """
+    Fixed-capacity ring buffer of the most recent jobs, shared by everything
+    that needs to look back at them (the /find index, repost detection,
+    mail.py's duplicate check).
+
+    append() gives each job a sequence number. get(seq) returns it as a
+    JobRecord until it is evicted: once `capacity` newer jobs arrived, or
+    it is older than `max_age` seconds. A discarded or re-appended job
+    leaves an empty slot until the ring comes round, so the buffer holds at
+    most `capacity` jobs, and sometimes fewer. Jobs are stored packed:
+    - repeated fields are interned (INTERNED_FIELDS);
+    - skills become a tuple of interned names;
+    - with `compress` the description is zlib-compressed, which is most of
+      a job's size.
+
+    subscribe() registers callbacks run as a job is added, on_add(seq,
+    record), and just before it leaves, on_evict(seq, record), so
+    secondary indexes stay in step with the buffer.
+    """
+
+    def __init__(self, capacity: int = RECENT_JOBS, max_age: float | None = None,
+                 compress: bool = RECENT_COMPRESS, clock=time.time):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.compress = compress
+        self.clock = clock
+        self.strings = Interner()
+        self._slots: list[tuple | None] = [None] * capacity
+        self._start = 0  # seq of the oldest slot still in the ring
+        self._next = 0   # seq the next job gets
+        self._by_job: dict[str, int] = {}
+        self._on_add = []
+        self._on_evict = []
+
+    def __len__(self):
+        return len(self._by_job)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._by_job
+
+    def subscribe(self, on_add=None, on_evict=None):
+        if on_add is not None:
+            self._on_add.append(on_add)
+        if on_evict is not None:
+            self._on_evict.append(on_evict)
+
+    # --- packing ---
+
+    def _pack(self, record: JobRecord, added_at: float) -> tuple:
+        values = [getattr(record, name) for name in _FIELDS]
+        for i in _INTERNED:
+            values[i] = self.strings.intern(values[i])
+        values[_SKILLS] = tuple(
+            self.strings.intern(s) for s in (record.skills or "").split(", ") if s
+        )
+        if self.compress and values[_DESCRIPTION]:
+            values[_DESCRIPTION] = zlib.compress(values[_DESCRIPTION].encode(), 6)
+        return (added_at, record.job_id, *values)
+
+    def _unpack(self, slot: tuple) -> JobRecord:
+        values = list(slot[2:])
+        values[_SKILLS] = ", ".join(values[_SKILLS])
+        if isinstance(values[_DESCRIPTION], bytes):
+            values[_DESCRIPTION] = zlib.decompress(values[_DESCRIPTION]).decode()
+        return JobRecord(*values)
+
+    def _release(self, slot: tuple):
+        values = slot[2:]
+        for i in _INTERNED:
+            self.strings.release(values[i])
+        for skill in values[_SKILLS]:
+            self.strings.release(skill)
+
+    # --- buffer ---
+
+    def append(self, record: JobRecord, added_at: float | None = None) -> int:
+        """Adds a job (replacing an earlier copy of it); returns its seq."""
+        if record.job_id in self._by_job:
+            self.discard(record.job_id)
+        if self._next - self._start >= self.capacity:
+            self._drop(self._start)
+            self._advance()
+
+        seq = self._next
+        self._next += 1
+        self._slots[seq % self.capacity] = self._pack(record, self.clock() if added_at is None else added_at)
+        self._by_job[record.job_id] = seq
+        for callback in self._on_add:
+            callback(seq, record)
+        self.evict()
+        return seq
+
+    def _drop(self, seq: int):
+        index = seq % self.capacity
+        slot = self._slots[index]
+        if slot is None:
+            return
+        if self._on_evict:
+            record = self._unpack(slot)
+            for callback in self._on_evict:
+                callback(seq, record)
+        self._slots[index] = None
+        self._release(slot)
+        if self._by_job.get(slot[1]) == seq:
+            del self._by_job[slot[1]]
+
+    def _advance(self):
+        """Moves the start past dropped slots."""
+        while self._start < self._next and self._slots[self._start % self.capacity] is None:
+            self._start += 1
+
+    def discard(self, job_id: str) -> bool:
+        seq = self._by_job.get(job_id)
+        if seq is None:
+            return False
+        self._drop(seq)
+        self._advance()
+        return True
+
+    def evict(self) -> int:
+        """Drops the jobs older than `max_age`; returns how many."""
+        if self.max_age is None:
+            return 0
+        cutoff = self.clock() - self.max_age
+        evicted = 0
+        while self._start < self._next and self._slots[self._start % self.capacity][0] < cutoff:
+            self._drop(self._start)
+            self._advance()
+            evicted += 1
+        return evicted
+
+    # --- lookups ---
+
+    def _slot(self, seq: int) -> tuple | None:
+        if not self._start <= seq < self._next:
+            return None
+        return self._slots[seq % self.capacity]
+
+    def get(self, seq: int) -> JobRecord | None:
+        slot = self._slot(seq)
+        return None if slot is None else self._unpack(slot)
+
+    def added_at(self, seq: int) -> float | None:
+        slot = self._slot(seq)
+        return None if slot is None else slot[0]
+
+    def find(self, job_id: str) -> int | None:
+        """Seq of a job still in the buffer."""
+        return self._by_job.get(job_id)
+
+    def seqs(self, newest_first: bool = True):
+        """Seqs of the jobs in the buffer."""
+        order = range(self._next - 1, self._start - 1, -1) if newest_first else range(self._start, self._next)
+        return [seq for seq in order if self._slots[seq % self.capacity] is not None]
@@ -0,0 +1,83 @@
+import re
+import json
+from dataclasses import dataclass
+
+
+# Google Sheet columns, in order
+# NOTE: Location moved between Project Title and Details
+SHEET_HEADERS = [
+    "Posted",
+    "Project Title",
+    "Location",
+    "Details",
+    "Payment Status",
+    "Total Spent",
+    "Description",
+    "Skills",
+    "Project URL",
+]
+
+_JOB_ID_RE = re.compile(r"~0[0-9a-f]+")
+
+
+def job_id_from_url(url: str) -> str:
+    """The stable "~02..." id from a job URL (falls back to the URL itself)."""
+    match = _JOB_ID_RE.search(url)
+    return match.group(0) if match else url
+
+
+@dataclass(frozen=True, slots=True)
+class JobRecord:
+    """
+    One job tile as produced by parse_project.
+    """
+    posted_ago: str
+    posted_time: str
+    title: str
+    url: str
+    total_spent: str
+    location: str
+    details: str
+    description: str
+    skills: str
+    payment_status: str
+
+    # Typed terms from extraction.extract_terms (None when the tile does not state them)
+    job_type: str | None = None
+    experience: str | None = None
+    budget: float | None = None
+    hourly_min: float | None = None
+    hourly_max: float | None = None
+    total_spent_value: float | None = None
+
+    @property
+    def job_id(self) -> str:
+        return job_id_from_url(self.url)
+
+    @property
+    def payment_verified(self) -> bool:
+        return self.payment_status == "Payment verified"
+
+    def to_row(self, title: str | None = None) -> list[str]:
+        """Sheet row in SHEET_HEADERS order; `title` overrides the plain title."""
+        return [
+            self.posted_time,
+            title or self.title,
+            self.location,
+            self.details,
+            self.payment_status,
+            self.total_spent,
+            self.description,
+            self.skills,
+            self.url,
+        ]
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JobRecord":
+        return cls(**data)
@@ -0,0 +1,397 @@
+import os
+import json
+import time
+import asyncio
+import operator
+
+from metrics import ALERT_LATENCY, OUTBOX_BACKLOG, SINK_FAILURES, SINK_FLUSH_TIME
+from outbox import OUTBOX_BATCH
+from records import JobRecord
+from sheets import SheetSink
+
+
+# ------------ PREDICATES ------------
+
+_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, operand: value in operand,
+    "contains": lambda value, operand: operand in value,
+}
+RECORD_FIELDS = set(JobRecord.__slots__) | {"job_id", "payment_verified"}
+
+
+def compile_predicate(spec, named: dict | None = None):
+    """
+    Turns a JSON predicate over a JobRecord into a function record -> bool.
+
+      {"payment_status": "Payment unverified", "hourly_max": {">": 20}}
+          every entry must hold; a plain value means equality
+      {"any": [spec, ...]}, {"all": [spec, ...]}, {"not": spec}
+      {"is": "name"}   the predicate called `name` in `named`
+
+    An operator test on a field that is None (not stated on the tile) is
+    False. Unknown fields and operators raise ValueError up front.
+    """
+    named = named or {}
+    if spec is None:
+        return lambda record: True
+    if isinstance(spec, list):
+        return compile_predicate({"all": spec}, named)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Predicate must be an object, got {spec!r}")
+
+    checks = []
+    for key, value in spec.items():
+        if key in ("any", "all"):
+            parts = [compile_predicate(v, named) for v in value]
+            combine = any if key == "any" else all
+            checks.append(lambda r, parts=parts, combine=combine: combine(p(r) for p in parts))
+        elif key == "not":
+            inner = compile_predicate(value, named)
+            checks.append(lambda r, inner=inner: not inner(r))
+        elif key == "is":
+            if value not in named:
+                raise ValueError(f"Unknown predicate {value!r}")
+            checks.append(compile_predicate(named[value], named))
+        elif key not in RECORD_FIELDS:
+            raise ValueError(f"Unknown record field {key!r}")
+        elif isinstance(value, dict):
+            for op, operand in value.items():
+                if op not in _OPS:
+                    raise ValueError(f"Unknown operator {op!r} for {key!r}")
+                checks.append(
+                    lambda r, key=key, fn=_OPS[op], operand=operand:
+                        getattr(r, key) is not None and fn(getattr(r, key), operand)
+                )
+        else:
+            checks.append(lambda r, key=key, value=value: getattr(r, key) == value)
+
+    if len(checks) == 1:
+        return checks[0]
+    return lambda r: all(check(r) for check in checks)
+
+
+# ------------ SINKS ------------
+#
+# Every sink renders a routed job into a JSON-able payload (sheet row,
+# message, line). add() + flush() buffer payloads in memory and write
+# them; deliver() writes payloads handed back by the outbox and reports,
+# per payload, whether it went through: a bool, or a future resolving to one.
+
+class WorksheetSink:
+    """
+    Rows for one worksheet, written in one batched call per flush.
+    `columns` are record fields; "symbol_title" is the title with the
+    category symbol in front. Default: the SHEET_HEADERS layout.
+    """
+    kind = "worksheet"
+
+    def __init__(self, name: str, worksheet, columns: list[str] | None = None, append: bool = False):
+        self.name = name
+        self.columns = columns
+        self.sheet = SheetSink(worksheet, append=append)
+
+    def render(self, record, match, **extras) -> list:
+        symbol_title = f"{match.symbol} {record.title}" if match.symbol else record.title
+        if self.columns is None:
+            return record.to_row(symbol_title)
+        return [symbol_title if c == "symbol_title" else getattr(record, c) for c in self.columns]
+
+    def add(self, record, match, **extras):
+        self.sheet.add(self.render(record, match))
+
+    async def flush(self, run_blocking) -> bool:
+        return await run_blocking(self.sheet.flush)
+
+    async def deliver(self, rows: list, run_blocking) -> list[bool]:
+        ok = await run_blocking(self.sheet.write, rows)
+        return [ok] * len(rows)
+
+
+def _observe_alert(saved_at: float):
+    """Done-callback for a delivery future: file saved -> alert delivered."""
+    def observe(delivered):
+        if not delivered.cancelled() and delivered.exception() is None and delivered.result():
+            ALERT_LATENCY.observe(time.time() - saved_at)
+    return observe
+
+
+class TelegramSink:
+    """Messages for one chat, queued on the rate-limited dispatcher at flush."""
+    kind = "telegram"
+
+    def __init__(self, name: str, dispatcher, chat_id, formatter):
+        self.name = name
+        self.dispatcher = dispatcher
+        self.chat_id = chat_id
+        self.formatter = formatter
+        self._pending: list = []
+
+    def render(self, record, match, saved_at: float | None = None, **extras) -> list:
+        return [self.formatter(record, match, **extras), saved_at]
+
+    def add(self, record, match, **extras):
+        self._pending.append(self.render(record, match, **extras))
+
+    async def _send(self, message: str, saved_at: float | None) -> asyncio.Future:
+        delivered = await self.dispatcher.send(self.chat_id, message)
+        if saved_at is not None:
+            delivered.add_done_callback(_observe_alert(saved_at))
+        return delivered
+
+    async def flush(self, run_blocking) -> bool:
+        messages, self._pending = self._pending, []
+        for i, (message, saved_at) in enumerate(messages):
+            try:
+                await self._send(message, saved_at)
+            except Exception:
+                self._pending = messages[i:] + self._pending
+                raise
+        return True
+
+    async def deliver(self, messages: list, run_blocking) -> list:
+        """
+        Queues the messages; returns a delivery future per message (False
+        for those that could not be queued), so each is acked as it goes out.
+        """
+        results = []
+        for message, saved_at in messages:
+            try:
+                results.append(await self._send(message, saved_at))
+            except Exception as e:
+                print(f"Failed to send message: {e}")
+                break
+        return results + [False] * (len(messages) - len(results))
+
+
+class FileSink:
+    """Jobs appended to a local JSON-lines file."""
+    kind = "file"
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self._pending: list[str] = []
+
+    def render(self, record, match, **extras) -> str:
+        data = record.to_dict()
+        data["category"] = match.category
+        return json.dumps(data, ensure_ascii=False)
+
+    def add(self, record, match, **extras):
+        self._pending.append(self.render(record, match))
+
+    def _write(self, lines: list[str]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def flush(self, run_blocking) -> bool:
+        lines, self._pending = self._pending, []
+        if not lines:
+            return True
+        try:
+            await run_blocking(self._write, lines)
+        except OSError:
+            self._pending = lines + self._pending
+            raise
+        return True
+
+    async def deliver(self, lines: list, run_blocking) -> list[bool]:
+        try:
+            await run_blocking(self._write, lines)
+        except OSError as e:
+            print(f"Write error: {e}")
+            return [False] * len(lines)
+        return [True] * len(lines)
+
+
+def build_sinks(specs: dict, open_worksheet=None, dispatcher=None, formatter=None) -> dict:
+    """
+    Sink objects for the "sinks" section of a rules file:
+
+      "sheet":    {"type": "worksheet", "worksheet": 0, "columns": [...], "append": false}
+      "telegram": {"type": "telegram", "chat_env": "TELEGRAM_CHAT_ID"}   (or "chat": id)
+      "archive":  {"type": "file", "path": "jobs.jsonl"}
+
+    `open_worksheet(index)` returns a worksheet, `formatter(record, match,
+    **extras)` a Telegram message.
+    """
+    sinks = {}
+    for name, spec in specs.items():
+        kind = spec.get("type")
+        if kind == "worksheet":
+            sinks[name] = WorksheetSink(
+                name, open_worksheet(spec.get("worksheet", 0)), spec.get("columns"), spec.get("append", False)
+            )
+        elif kind == "telegram":
+            chat_id = spec.get("chat") or os.getenv(spec.get("chat_env", "TELEGRAM_CHAT_ID"))
+            sinks[name] = TelegramSink(name, dispatcher, chat_id, formatter)
+        elif kind == "file":
+            sinks[name] = FileSink(name, spec["path"])
+        else:
+            raise ValueError(f"Sink {name!r} has unknown type {kind!r}")
+    return sinks
+
+
+def worksheet_indices(specs: dict) -> list[int]:
+    """Worksheet indices the "worksheet" sinks in `specs` write to."""
+    return sorted({spec.get("worksheet", 0) for spec in specs.values() if spec.get("type") == "worksheet"})
+
+
+# ------------ ROUTER ------------
+
+class Router:
+    """
+    Fans routed jobs out to their sinks.
+
+    route() only buffers. Without an outbox, flush() writes every sink
+    concurrently, each with its own batched call. A sink that raises or
+    reports failure is logged and keeps what it could not write where it
+    can (sheet rows, file lines). The other sinks are not held up by it.
+
+    With an outbox, flush() only commits the routed payloads to it, which
+    is durable. Then one background worker per sink (start()) delivers
+    them in batches of `batch`, acks what went through, and backs off and
+    retries the rest. Nothing routed is lost to a failed API call or a
+    crash, and a backlog from an outage goes out in full batches.
+    """
+
+    def __init__(self, sinks: dict, run_blocking, outbox=None, batch: int = OUTBOX_BATCH):
+        self.sinks = sinks
+        self.run_blocking = run_blocking
+        self.outbox = outbox
+        self.batch = batch
+        self._unknown: set[str] = set()
+        self._locks = {name: asyncio.Lock() for name in sinks}
+        self._wakeups: dict[str, asyncio.Event] = {}
+        self._workers: list[asyncio.Task] = []
+
+    def route(self, record, match, exclude: set | frozenset = frozenset(), **extras):
+        """Buffers `record` for every sink in match.sinks whose kind is not in `exclude`."""
+        for name in match.sinks:
+            sink = self.sinks.get(name)
+            if sink is None:
+                if name not in self._unknown:
+                    self._unknown.add(name)
+                    print(f"Route to unknown sink {name!r} ignored (sinks are read at start-up)")
+                continue
+            if sink.kind in exclude:
+                continue
+            if self.outbox is not None:
+                self.outbox.put(name, sink.render(record, match, **extras))
+            else:
+                sink.add(record, match, **extras)
+
+    async def _flush(self, name: str, sink) -> bool:
+        start = time.perf_counter()
+        try:
+            ok = await sink.flush(self.run_blocking)
+        except Exception as e:
+            print(f"Sink {name} failed: {e}")
+            ok = False
+        else:
+            if not ok:
+                print(f"Sink {name} failed, will retry on the next flush")
+        SINK_FLUSH_TIME.observe(time.perf_counter() - start, sink=name, kind=sink.kind)
+        if not ok:
+            SINK_FAILURES.inc(sink=name, kind=sink.kind)
+        return ok
+
+    async def flush(self) -> dict[str, bool]:
+        names = list(self.sinks)
+        if self.outbox is not None:
+            await self.run_blocking(self.outbox.commit)
+            for event in self._wakeups.values():
+                event.set()
+            return dict.fromkeys(names, True)
+
+        results = await asyncio.gather(*(self._flush(name, self.sinks[name]) for name in names))
+        return dict(zip(names, results))
+
+    # --- OUTBOX DELIVERY ---
+
+    async def _drain(self, name: str) -> bool:
+        """Delivers everything pending in the outbox for sink `name`; False if a batch failed."""
+        sink = self.sinks[name]
+        async with self._locks[name]:
+            while True:
+                entries = await self.run_blocking(self.outbox.pending, name, self.batch)
+                if not entries:
+                    return True
+
+                start = time.perf_counter()
+                try:
+                    results = await sink.deliver([payload for _, payload in entries], self.run_blocking)
+                except Exception as e:
+                    print(f"Sink {name} failed: {e}")
+                    results = [False] * len(entries)
+                SINK_FLUSH_TIME.observe(time.perf_counter() - start, sink=name, kind=sink.kind)
+
+                failed = []
+                waiting = {}
+                delivered = []
+                for (entry_id, _), result in zip(entries, results):
+                    if isinstance(result, asyncio.Future):
+                        waiting[result] = entry_id
+                    elif result:
+                        delivered.append(entry_id)
+                    else:
+                        failed.append(entry_id)
+                await self.run_blocking(self.outbox.ack, delivered)
+
+                # Ack messages one by one as Telegram accepts them, so a crash
+                # mid-batch re-sends only what was not delivered yet
+                while waiting:
+                    done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                    delivered = []
+                    for future in done:
+                        entry_id = waiting.pop(future)
+                        ok = not future.cancelled() and future.exception() is None and future.result()
+                        (delivered if ok else failed).append(entry_id)
+                    await self.run_blocking(self.outbox.ack, delivered)
+
+                if failed:
+                    SINK_FAILURES.inc(sink=name, kind=sink.kind)
+                    parked = await self.run_blocking(self.outbox.failed, failed)
+                    print(f"Sink {name}: {len(failed)} deliveries failed, kept in the outbox for retry")
+                    if parked:
+                        print(f"Sink {name}: {parked} entries gave up after {self.outbox.max_attempts} attempts")
+                    return False
+
+    async def drain(self) -> dict[str, bool]:
+        """Delivers the whole outbox backlog now, all sinks concurrently."""
+        names = list(self.sinks)
+        results = await asyncio.gather(*(self._drain(name) for name in names))
+        return dict(zip(names, results))
+
+    async def _worker(self, name: str):
+        wakeup = self._wakeups[name]
+        failures = 0
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            if await self._drain(name):
+                failures = 0
+            else:
+                failures += 1
+                await asyncio.sleep(min(2 ** failures, 300))
+                wakeup.set()
+            OUTBOX_BACKLOG.set(sum((await self.run_blocking(self.outbox.backlog)).values()))
+
+    def start(self):
+        """Starts the outbox workers; whatever a previous run left undelivered goes out first."""
+        for name in self.sinks:
+            self._wakeups[name] = asyncio.Event()
+            self._wakeups[name].set()
+            self._workers.append(asyncio.create_task(self._worker(name)))
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
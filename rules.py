@@ -0,0 +1,220 @@
+import os
+import json
+from collections import Counter
+from dataclasses import dataclass
+
+from keywords import KeywordMatcher
+from metrics import RULE_HITS
+from routing import compile_predicate
+
+
+RULES_FILE = os.getenv("RULES_FILE", "rules.json")
+
+# Group-name prefixes inside the shared matcher
+_CATEGORY = "category:"
+_HIGHLIGHT = "highlight:"
+_KEYWORD_SET = "set:"
+
+
+@dataclass(frozen=True, slots=True)
+class JobMatch:
+    """What the rules say about one job."""
+    category: str
+    symbol: str
+    highlights: tuple[str, ...]
+    markers: tuple[str, ...]
+    counts: dict
+    sinks: frozenset
+    routes: tuple[str, ...]
+
+
+def _check_keywords(group: str, keywords):
+    """Rejects what KeywordMatcher cannot compile: "", "*", non-strings."""
+    if not isinstance(keywords, list):
+        raise ValueError(f"Keywords of {group} must be a list")
+    for kw in keywords:
+        if not isinstance(kw, str) or not kw.strip().rstrip("*"):
+            raise ValueError(f"Bad keyword {kw!r} in {group}")
+
+
+class RuleSet:
+    """
+    One compiled rules file.
+
+    {
+      "categories": [{"name": ..., "symbol": "🎨", "keywords": [...],
+                      "weights": {"figma": 2}}],          # weight defaults to 1
+      "highlights": [{"name": ..., "marker": "🔥", "keywords": [...]}],
+      "keyword_sets": {"automation": ["scrap*", ...]},      # for routes only
+      "predicates": {"unverified": {"payment_status": "Payment unverified"}},
+      "sinks": {"telegram": {"type": "telegram", ...}},       # see routing.build_sinks
+      "routes": [{"name": ..., "sink": "telegram",
+                  "categories": [...], "highlights": [...], "keyword_sets": [...],
+                  "where": {"is": "unverified", "budget": {">": 500}}}]
+    }
+
+    All keyword lists are compiled into one KeywordMatcher, so evaluating a
+    job is a single scan. A route without conditions takes every job; with
+    conditions, each listed kind must match at least one of its entries and
+    `where` (see routing.compile_predicate) must hold for the record.
+    """
+
+    def __init__(self, data: dict):
+        self.categories = data.get("categories", [])
+        self.highlights = data.get("highlights", [])
+        self.keyword_sets = data.get("keyword_sets", {})
+        self.routes = data.get("routes", [])
+        self.sinks = data.get("sinks", {})
+        self.predicates = data.get("predicates", {})
+        for route in self.routes:
+            if not isinstance(route, dict) or not isinstance(route.get("sink"), str):
+                raise ValueError(f"Route {route!r} needs a \"sink\" name")
+        self._where = [compile_predicate(r.get("where"), self.predicates) for r in self.routes]
+
+        self.symbols = {c["name"]: c.get("symbol", "") for c in self.categories}
+        self.weights = {c["name"]: c.get("weights", {}) for c in self.categories}
+        self.markers = {h["name"]: h.get("marker", "") for h in self.highlights}
+
+        groups = {}
+        for c in self.categories:
+            groups[_CATEGORY + c["name"]] = c["keywords"]
+        for h in self.highlights:
+            groups[_HIGHLIGHT + h["name"]] = h["keywords"]
+        for name, keywords in self.keyword_sets.items():
+            groups[_KEYWORD_SET + name] = keywords
+
+        for name, keywords in groups.items():
+            _check_keywords(name, keywords)
+        self.matcher = KeywordMatcher(groups)
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def symbol(self, category: str) -> str:
+        return self.symbols.get(category, "")
+
+    def evaluate_text(self, title: str, description: str, skills: str, record=None) -> JobMatch:
+        """
+        Category, highlights and sinks for a job. Routes with a `where`
+        predicate only match when the parsed `record` is given.
+        """
+        hits = self.matcher.hits(f"{title} {description} {skills}".lower())
+
+        best_cat = "Other"
+        best_score = 0
+        counts = {}
+        for c in self.categories:
+            name = c["name"]
+            weights = self.weights[name]
+            score = sum(weights.get(kw, 1) for kw in hits[_CATEGORY + name])
+            counts[name] = score
+            if score > best_score:
+                best_score = score
+                best_cat = name
+
+        highlights = []
+        for h in self.highlights:
+            name = h["name"]
+            counts[name] = len(hits[_HIGHLIGHT + name])
+            if counts[name]:
+                highlights.append(name)
+
+        matched_sets = {name for name in self.keyword_sets if hits[_KEYWORD_SET + name]}
+
+        sinks = set()
+        routes = []
+        for route, where in zip(self.routes, self._where):
+            if "where" in route and (record is None or not where(record)):
+                continue
+            if self._route_matches(route, best_cat, highlights, matched_sets):
+                sinks.add(route["sink"])
+                routes.append(route.get("name", route["sink"]))
+
+        return JobMatch(
+            category=best_cat,
+            symbol=self.symbol(best_cat),
+            highlights=tuple(highlights),
+            markers=tuple(self.markers[h] for h in highlights if self.markers[h]),
+            counts=counts,
+            sinks=frozenset(sinks),
+            routes=tuple(routes),
+        )
+
+    @staticmethod
+    def _route_matches(route: dict, category: str, highlights: list, matched_sets: set) -> bool:
+        if "categories" in route and category not in route["categories"]:
+            return False
+        if "highlights" in route and not set(route["highlights"]) & set(highlights):
+            return False
+        if "keyword_sets" in route and not set(route["keyword_sets"]) & matched_sets:
+            return False
+        return True
+
+
+class RuleEngine:
+    """
+    Loads RuleSet from a JSON file and reloads it when the file changes.
+
+    maybe_reload() is a single stat() call, so the monitor can call it for
+    every snapshot. A broken edit keeps the previous rules running. Hit
+    counts per category, highlight and route are kept across reloads and
+    exported as upwork_rule_hits on /metrics.
+    """
+
+    def __init__(self, path: str = RULES_FILE):
+        self.path = path
+        self.hits = Counter()
+        self._mtime = None
+        self.current = None
+        self.maybe_reload()
+        if self.current is None:
+            raise ValueError(f"Could not load rules from {path}")
+
+    def maybe_reload(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            print(f"Rules file error: {e}")
+            return False
+
+        if mtime == self._mtime:
+            return False
+
+        try:
+            rules = RuleSet.from_file(self.path)
+        except Exception as e:
+            print(f"Rules reload failed, keeping previous rules: {e}")
+            self._mtime = mtime
+            return False
+
+        self.current = rules
+        self._mtime = mtime
+        print(
+            f"Loaded rules from {self.path}: {len(rules.categories)} categories, "
+            f"{len(rules.highlights)} highlights, {len(rules.routes)} routes"
+        )
+        return True
+
+    def evaluate(self, record, count: bool = True) -> JobMatch:
+        """The rules' verdict on a job; with `count` its hits are counted right away."""
+        match = self.current.evaluate_text(record.title, record.description, record.skills, record)
+        if count:
+            self.count(match)
+        return match
+
+    def count(self, match: JobMatch):
+        """Adds a match to the per-category / highlight / route hit counts."""
+        self._hit("category", match.category)
+        for name in match.highlights:
+            self._hit("highlight", name)
+        for name in match.routes:
+            self._hit("route", name)
+
+    def _hit(self, kind: str, name: str):
+        self.hits[f"{kind}:{name}"] += 1
+        RULE_HITS.inc(kind=kind, name=name)
+
+    def stats(self) -> dict:
+        return dict(self.hits)
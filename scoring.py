@@ -0,0 +1,255 @@
+import os
+import re
+import csv
+import sys
+import zlib
+import argparse
+
+import numpy as np
+
+from records import SHEET_HEADERS
+from rules import RULES_FILE, RuleSet
+
+
+SCORING_MODEL = os.getenv("SCORING_MODEL", "scoring_model.npz")
+N_FEATURES = 2 ** 18
+PROFILES = ("UI/UX Design", "Mobile Development", "Full Stack (.NET/React/AI)", "Embedded")
+
+_TOKEN_RE = re.compile(r"[a-z0-9#+]+(?:[./-][a-z0-9#+]+)*")
+
+
+# ------------ HASHING VECTORIZER ------------
+
+def job_text(record) -> str:
+    return f"{record.title} {record.description} {record.skills}"
+
+
+def _features(text: str) -> list[int]:
+    """crc32 of every unigram and bigram; stable across runs, unlike hash()."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    feats = [zlib.crc32(t.encode()) for t in tokens]
+    feats += [zlib.crc32(f"{a} {b}".encode()) for a, b in zip(tokens, tokens[1:])]
+    return feats
+
+
+def hash_texts(texts: list[str], n_features: int = N_FEATURES):
+    """
+    Term counts of each text as CSR arrays (indptr, indices, counts).
+    Row i holds the non-zero hashed features of texts[i], sorted by column.
+    """
+    cols, lengths = [], []
+    for text in texts:
+        feats = _features(text)
+        cols.extend(feats)
+        lengths.append(len(feats))
+
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    keys = rows * n_features + np.asarray(cols, dtype=np.int64) % n_features
+    keys, counts = np.unique(keys, return_counts=True)
+
+    indptr = np.searchsorted(keys // n_features, np.arange(len(texts) + 1))
+    return indptr, keys % n_features, counts.astype(np.float32)
+
+
+def _row_of(indptr) -> np.ndarray:
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _row_sums(row_of, values, n_rows: int) -> np.ndarray:
+    """Sum of `values` (nnz x k) per row -> (n_rows x k)."""
+    return np.stack(
+        [np.bincount(row_of, weights=values[:, k], minlength=n_rows) for k in range(values.shape[1])],
+        axis=1,
+    )
+
+
+def tfidf(indptr, indices, counts, idf) -> np.ndarray:
+    """Sublinear TF-IDF values for the CSR entries, L2-normalised per row."""
+    row_of = _row_of(indptr)
+    data = (1 + np.log(counts)) * idf[indices]
+    norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(indptr) - 1))
+    norms[norms == 0] = 1
+    return (data / norms[row_of]).astype(np.float32)
+
+
+# ------------ MODEL ------------
+
+class ProfileScorer:
+    """
+    One-vs-rest logistic model per profile over hashed TF-IDF features.
+
+    Scoring a snapshot is one sparse-times-dense product: the CSR entries of
+    all jobs pick their rows of `weights` (features x profiles), and the
+    products are summed per job. Scores are probabilities in 0..1.
+    """
+
+    def __init__(self, profiles, idf, weights, bias):
+        self.profiles = tuple(profiles)
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+    @property
+    def n_features(self) -> int:
+        return len(self.idf)
+
+    def _matrix(self, texts: list[str]):
+        indptr, indices, counts = hash_texts(texts, self.n_features)
+        return _row_of(indptr), indices, tfidf(indptr, indices, counts, self.idf)
+
+    def _logits(self, row_of, indices, data, n_rows: int) -> np.ndarray:
+        return _row_sums(row_of, data[:, None] * self.weights[indices], n_rows) + self.bias
+
+    def score_texts(self, texts: list[str]) -> np.ndarray:
+        """(len(texts) x profiles) relevance scores."""
+        if not texts:
+            return np.zeros((0, len(self.profiles)), dtype=np.float32)
+        row_of, indices, data = self._matrix(texts)
+        return 1 / (1 + np.exp(-self._logits(row_of, indices, data, len(texts))))
+
+    @classmethod
+    def train(cls, texts: list[str], labels: list[set], profiles=PROFILES,
+              n_features: int = N_FEATURES, epochs: int = 200, lr: float = 0.1, l2: float = 1e-5):
+        """
+        Fits the model with full-batch Adam on the logistic loss. Runs
+        offline. Only hashed columns that occur in `texts` are trained; the
+        rest keep weight 0.
+        """
+        indptr, indices, counts = hash_texts(texts, n_features)
+        n = len(texts)
+
+        df = np.bincount(indices, minlength=n_features)
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+
+        row_of = _row_of(indptr)
+        data = tfidf(indptr, indices, counts, idf)
+        used, local = np.unique(indices, return_inverse=True)
+        target = np.array([[p in labels[i] for p in profiles] for i in range(n)], dtype=np.float32)
+
+        model = cls(profiles, idf, np.zeros((len(used), len(profiles)), dtype=np.float32),
+                    np.zeros(len(profiles), dtype=np.float32))
+        params = [model.weights, model.bias]
+        moments = [(np.zeros_like(p), np.zeros_like(p)) for p in params]
+
+        for step in range(1, epochs + 1):
+            probs = 1 / (1 + np.exp(-model._logits(row_of, local, data, n)))
+            error = (probs - target) / n
+            grads = [
+                _row_sums(local, data[:, None] * error[row_of], len(used)) + l2 * model.weights,
+                error.sum(axis=0),
+            ]
+            for param, grad, (m, v) in zip(params, grads, moments):
+                m += 0.1 * (grad - m)
+                v += 0.001 * (grad * grad - v)
+                param -= lr * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+
+        weights = np.zeros((n_features, len(profiles)), dtype=np.float32)
+        weights[used] = model.weights
+        model.weights = weights
+        return model
+
+    def save(self, path: str = SCORING_MODEL):
+        np.savez_compressed(
+            path, profiles=np.array(self.profiles), idf=self.idf, weights=self.weights, bias=self.bias
+        )
+
+    @classmethod
+    def load(cls, path: str = SCORING_MODEL) -> "ProfileScorer":
+        with np.load(path) as f:
+            return cls(f["profiles"].tolist(), f["idf"], f["weights"], f["bias"])
+
+
+_scorer = None
+
+
+def get_scorer(path: str = SCORING_MODEL) -> ProfileScorer | None:
+    """The trained model, loaded once; None until `scoring.py train` has been run."""
+    global _scorer
+    if _scorer is None and os.path.exists(path):
+        _scorer = ProfileScorer.load(path)
+        print(f"Loaded scoring model from {path}: {', '.join(_scorer.profiles)}")
+    return _scorer
+
+
+def score_batch(records, scorer: ProfileScorer | None = None) -> list[dict[str, float]] | None:
+    """
+    Relevance score per profile for every record of a snapshot, in one
+    vectorised pass. Returns None when no model is available.
+    """
+    scorer = scorer or get_scorer()
+    if scorer is None:
+        return None
+    scores = scorer.score_texts([job_text(r) for r in records])
+    return [dict(zip(scorer.profiles, map(float, row))) for row in scores]
+
+
+# ------------ OFFLINE TRAINING ------------
+
+def load_history(path: str, rules: RuleSet) -> tuple[list[str], list[set]]:
+    """
+    Labeled jobs from a CSV export of the Google Sheet.
+
+    An optional "Profiles" column (names separated by ";") gives the labels.
+    Otherwise the category comes from the symbol the monitor put in front
+    of the title, and highlight profiles (Embedded) from the rules.
+    """
+    by_symbol = {symbol: name for name, symbol in rules.symbols.items() if symbol}
+    title_col, desc_col, skills_col = SHEET_HEADERS[1], SHEET_HEADERS[6], SHEET_HEADERS[7]
+
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            title = row.get(title_col, "")
+            description = row.get(desc_col, "")
+            skills = row.get(skills_col, "")
+
+            if row.get("Profiles"):
+                profiles = {p.strip() for p in row["Profiles"].split(";") if p.strip()}
+            else:
+                symbol, _, rest = title.partition(" ")
+                profiles = set()
+                if symbol in by_symbol:
+                    profiles.add(by_symbol[symbol])
+                    title = rest
+                profiles.update(rules.evaluate_text(title, description, skills).highlights)
+
+            texts.append(f"{title} {description} {skills}")
+            labels.append(profiles)
+    return texts, labels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the per-profile relevance model offline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="fit the model on a CSV export of the sheet")
+    train.add_argument("history", help="CSV with the sheet columns, optionally a Profiles column")
+    train.add_argument("--rules", default=RULES_FILE)
+    train.add_argument("--out", default=SCORING_MODEL)
+    train.add_argument("--epochs", type=int, default=200)
+    train.add_argument("--holdout", type=float, default=0.2, help="share of rows kept for evaluation")
+
+    args = parser.parse_args(argv)
+
+    texts, labels = load_history(args.history, RuleSet.from_file(args.rules))
+    split = int(len(texts) * (1 - args.holdout))
+    model = ProfileScorer.train(texts[:split], labels[:split], epochs=args.epochs)
+
+    if split < len(texts):
+        scores = model.score_texts(texts[split:])
+        for k, name in enumerate(model.profiles):
+            truth = np.array([name in l for l in labels[split:]])
+            predicted = scores[:, k] >= 0.5
+            tp = int((truth & predicted).sum())
+            print(
+                f"{name:28} positives {int(truth.sum()):5} | precision "
+                f"{tp / max(1, predicted.sum()):.2f} | recall {tp / max(1, truth.sum()):.2f}"
+            )
+
+    model = ProfileScorer.train(texts, labels, epochs=args.epochs)
+    model.save(args.out)
+    print(f"Trained on {len(texts)} jobs, saved {args.out}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import os
+import re
+import time
+import asyncio
+import bisect
+from datetime import datetime, timezone
+
+from extraction import parse_money
+from records import JobRecord
+from recent import RECENT_JOBS, RecentJobs
+
+
+SEARCH_DAYS = float(os.getenv("SEARCH_DAYS", "7"))  # 0 turns /find off
+SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "10"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*|\.[a-z][a-z0-9]*")
+# ">$1000", "<=$50/h", "spent>$10k"
+_FILTER_RE = re.compile(r"^(spent)?(>=|<=|>|<)\$?([\d,.]+[km]?)(/h|/hr)?$", re.IGNORECASE)
+_DAYS_RE = re.compile(r"^<(\d+(?:\.\d+)?)d$")
+
+FIND_USAGE = (
+    "Usage: /find flutter firebase >$1000\n"
+    "  words      all must occur in title, description or skills\n"
+    "  -word      must not occur\n"
+    "  >$1000     fixed-price budget (also <, >=, <=; $5k works)\n"
+    "  >$30/h     top hourly rate\n"
+    "  spent>$10k client's total spent\n"
+    "  <3d        only the last 3 days"
+)
+
+
+def tokenize(text: str) -> set[str]:
+    """Lower-case words; keeps "c#", "c++", ".net" and "node.js" whole."""
+    return set(_TOKEN_RE.findall((text or "").lower()))
+
+
+# ------------ QUERY ------------
+
+class Query:
+    """
+    A parsed /find query:
+
+      flutter firebase     every word must occur in title, description or skills
+      -wordpress           the word must not occur
+      >$1000  <=$5k        fixed-price budget
+      >$30/h               top hourly rate
+      spent>$10k           client's total spent
+      <3d                  only jobs from the last 3 days
+    """
+
+    def __init__(self, text: str):
+        self.words: list[str] = []
+        self.excluded: list[str] = []
+        self.ranges: list[tuple[str, str, float]] = []
+        self.days: float | None = None
+
+        for part in (text or "").split():
+            match = _FILTER_RE.match(part)
+            if match:
+                spent, op, amount, hourly = match.groups()
+                field = "spent" if spent else "hourly" if hourly else "budget"
+                values = parse_money("$" + amount)
+                if values:
+                    self.ranges.append((field, op, values[0]))
+                continue
+            match = _DAYS_RE.match(part.lower())
+            if match:
+                self.days = float(match.group(1))
+            elif part.startswith("-") and len(part) > 1:
+                self.excluded.extend(tokenize(part[1:]))
+            else:
+                self.words.extend(tokenize(part))
+
+    def __bool__(self):
+        return bool(self.words or self.ranges or self.days)
+
+
+# ------------ INDEX ------------
+
+class JobIndex:
+    """
+    Inverted index over the jobs held in a RecentJobs buffer.
+
+    Every token of a job's title, description and skills maps to the set
+    of buffer seqs that contain it. Budget, hourly rate and total spent
+    are kept as sorted (value, seq) lists, so a range is two bisects. The
+    index follows the buffer: a job is indexed as it is appended and
+    unindexed as the buffer evicts it, by age or capacity, which caps the
+    memory used. Per-job tokens are not kept; they are recomputed on
+    eviction. A query intersects the posting sets, smallest first, and
+    returns the newest matches.
+    """
+
+    def __init__(self, recent: RecentJobs | None = None, max_age: float = SEARCH_DAYS * 86400,
+                 max_jobs: int = RECENT_JOBS, clock=time.time):
+        if recent is None:
+            recent = RecentJobs(max_jobs, max_age, clock=clock)
+        self.recent = recent
+        self._postings: dict[str, set[int]] = {}
+        self._numeric: dict[str, list[tuple[float, int]]] = {"budget": [], "hourly": [], "spent": []}
+        recent.subscribe(on_add=self._index, on_evict=self._unindex)
+
+    def __len__(self):
+        return len(self.recent)
+
+    @staticmethod
+    def _tokens(record: JobRecord) -> set[str]:
+        return tokenize(record.title) | tokenize(record.description) | tokenize(record.skills)
+
+    @staticmethod
+    def _values(record: JobRecord) -> dict[str, float | None]:
+        return {"budget": record.budget, "hourly": record.hourly_max, "spent": record.total_spent_value}
+
+    def add(self, record: JobRecord, added_at: float | None = None) -> int:
+        """Appends a job to the buffer, which indexes it; returns its seq."""
+        return self.recent.append(record, added_at)
+
+    def _index(self, seq: int, record: JobRecord):
+        for token in self._tokens(record):
+            self._postings.setdefault(token, set()).add(seq)
+        for field, value in self._values(record).items():
+            if value is not None:
+                bisect.insort(self._numeric[field], (value, seq))
+
+    def _unindex(self, seq: int, record: JobRecord):
+        for token in self._tokens(record):
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.discard(seq)
+                if not posting:
+                    del self._postings[token]
+        for field, value in self._values(record).items():
+            if value is not None:
+                entries = self._numeric[field]
+                i = bisect.bisect_left(entries, (value, seq))
+                if i < len(entries) and entries[i] == (value, seq):
+                    del entries[i]
+
+    def evict(self) -> int:
+        return self.recent.evict()
+
+    def _in_range(self, field: str, op: str, value: float) -> set[int]:
+        entries = self._numeric[field]
+        if op == ">":
+            return {seq for _, seq in entries[bisect.bisect_right(entries, (value, float("inf"))):]}
+        if op == ">=":
+            return {seq for _, seq in entries[bisect.bisect_left(entries, (value, -1)):]}
+        if op == "<":
+            return {seq for _, seq in entries[:bisect.bisect_left(entries, (value, -1))]}
+        return {seq for _, seq in entries[:bisect.bisect_right(entries, (value, float("inf")))]}
+
+    def search(self, query: Query | str, limit: int = SEARCH_RESULTS) -> tuple[int, list[JobRecord]]:
+        """(number of matches, newest `limit` matching records)."""
+        if isinstance(query, str):
+            query = Query(query)
+        self.evict()
+
+        candidates = [self._postings.get(word, set()) for word in query.words]
+        candidates += [self._in_range(*r) for r in query.ranges]
+        candidates.sort(key=len)
+
+        if candidates:
+            matches = set(candidates[0])
+            for other in candidates[1:]:
+                matches &= other
+                if not matches:
+                    break
+        else:
+            matches = set(self.recent.seqs())
+
+        for word in query.excluded:
+            matches -= self._postings.get(word, set())
+        if query.days is not None:
+            cutoff = self.recent.clock() - query.days * 86400
+            matches = {seq for seq in matches if self.recent.added_at(seq) >= cutoff}
+
+        newest = sorted(matches, reverse=True)[:limit]
+        return len(matches), [self.recent.get(seq) for seq in newest]
+
+    def warm_from_archive(self, root: str) -> int:
+        """Indexes the archived jobs young enough for the buffer; returns how many were read."""
+        from archive import load
+
+        since = None
+        if self.recent.max_age is not None:
+            since = datetime.fromtimestamp(self.recent.clock() - self.recent.max_age, timezone.utc)
+        table = load(root, since=since)
+        for row in table.to_pylist():
+            record = JobRecord(
+                posted_ago="",
+                posted_time=row["posted_time"] or "",
+                title=row["title"] or "",
+                url=row["url"] or "",
+                total_spent="",
+                location=row["location"] or "",
+                details=row["details"] or "",
+                description=row["description"] or "",
+                skills=", ".join(row["skills"] or []),
+                payment_status=row["payment_status"] or "",
+                job_type=row["job_type"],
+                experience=row["experience"],
+                budget=row["budget"],
+                hourly_min=row["hourly_min"],
+                hourly_max=row["hourly_max"],
+                total_spent_value=row["total_spent_value"],
+            )
+            self.add(record, row["seen_at"].timestamp())
+        return table.num_rows
+
+
+# ------------ TELEGRAM /find ------------
+
+async def serve_find(bot, index: JobIndex, reply, chats: set[str], formatter, poll_timeout: int = 30):
+    """
+    Answers "/find <query>" messages from `chats` by long-polling
+    bot.get_updates; replies go out through `reply(chat_id, text)` (the
+    rate-limited dispatcher). Messages from other chats are ignored.
+    """
+    offset = None
+    failures = 0
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=poll_timeout, allowed_updates=["message"])
+            failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            failures += 1
+            delay = min(2 ** failures, 60)
+            print(f"Telegram polling error: {e}, retrying in {delay}s")
+            await asyncio.sleep(delay)
+            continue
+
+        for update in updates:
+            offset = update.update_id + 1
+            message = update.message
+            if message is None or not message.text:
+                continue
+            command, _, text = message.text.strip().partition(" ")
+            if command.split("@")[0] != "/find":
+                continue
+            chat_id = str(message.chat_id)
+            if chat_id not in chats:
+                print(f"Ignored /find from chat {chat_id}")
+                continue
+
+            # One bad query must not end the polling
+            try:
+                query = Query(text)
+                if not query:
+                    await reply(chat_id, FIND_USAGE)
+                    continue
+                total, records = index.search(query)
+                await reply(chat_id, formatter(text, total, records))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"/find {text!r} failed: {e}")
+                try:
+                    await reply(chat_id, FIND_USAGE)
+                except Exception as e:
+                    print(f"/find reply failed: {e}")
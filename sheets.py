@@ -0,0 +1,139 @@
+import time
+import random
+import threading
+
+
+# HTTP statuses from the Sheets API that are worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _status_code(error: Exception) -> int | None:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+class SheetSink:
+    """
+    Buffers sheet rows and writes them with a single insert_rows call.
+
+    add() only buffers and reports whether a flush is due: `max_rows` are
+    waiting or the oldest buffered row is older than `max_delay` seconds.
+    flush() does the blocking API call, so async callers should run it in a
+    worker thread; add() and flush() may be called from different threads.
+
+    Newest-on-top ordering is kept: the last row added ends up directly
+    under the header, exactly as repeated insert_row(row, 2) calls used to do.
+    With `append=True` rows go to the bottom in order, like append_row.
+
+    Failed writes are retried with exponential backoff on 429/5xx; if they
+    still fail, the rows stay buffered for the next flush.
+    """
+
+    def __init__(self, worksheet, max_rows: int = 50, max_delay: float = 10.0,
+                 max_retries: int = 5, backoff: float = 1.0, sleep=time.sleep, append: bool = False):
+        self.worksheet = worksheet
+        self.append = append
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self._rows: list[list] = []
+        self._first_added: float | None = None
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, row: list) -> bool:
+        """Buffers a row; returns True if the buffer is due for a flush."""
+        with self._buffer_lock:
+            if not self._rows:
+                self._first_added = time.monotonic()
+            self._rows.append(row)
+        return self.due()
+
+    def due(self) -> bool:
+        if not self._rows:
+            return False
+        if len(self._rows) >= self.max_rows:
+            return True
+        return time.monotonic() - self._first_added >= self.max_delay
+
+    def flush(self) -> bool:
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> bool:
+        with self._buffer_lock:
+            if not self._rows:
+                return True
+            rows, self._rows = self._rows, []
+            first_added, self._first_added = self._first_added, None
+
+        if self.write(rows):
+            return True
+
+        # Keep the rows (ahead of anything added meanwhile) for the next flush
+        with self._buffer_lock:
+            self._rows = rows + self._rows
+            self._first_added = first_added
+        return False
+
+    def write(self, rows: list[list]) -> bool:
+        """
+        Writes `rows` in one call, with the retries above, bypassing the
+        buffer; returns False if they could not be written.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.append:
+                    self.worksheet.append_rows(rows, value_input_option="RAW")
+                else:
+                    # insert_rows keeps the given order, newest must come first
+                    self.worksheet.insert_rows(rows[::-1], row=2, value_input_option="RAW")
+                print(f"{'Appended' if self.append else 'Inserted'} {len(rows)} rows")
+                return True
+            except Exception as e:
+                status = _status_code(e)
+                if status not in RETRY_STATUSES or attempt == self.max_retries:
+                    print(f"Insert error: {e}")
+                    break
+                delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+                print(f"Sheets API returned {status}, retrying in {delay:.1f}s")
+                self.sleep(delay)
+        return False
+
+
+class MemoryWorksheet:
+    """
+    Local stand-in for a gspread worksheet, for tests and benchmarks.
+    Set `fail_with` to a list of exceptions to raise on the next calls.
+    """
+
+    def __init__(self, header: list | None = None):
+        self.rows: list[list] = [list(header)] if header else []
+        self.calls = 0
+        self.fail_with: list[Exception] = []
+
+    def row_values(self, index: int) -> list:
+        return list(self.rows[index - 1]) if len(self.rows) >= index else []
+
+    def insert_row(self, values: list, index: int = 1, **kwargs):
+        self.insert_rows([values], row=index)
+
+    def insert_rows(self, values: list[list], row: int = 1, **kwargs):
+        self.calls += 1
+        if self.fail_with:
+            raise self.fail_with.pop(0)
+        self.rows[row - 1:row - 1] = [list(v) for v in values]
+
+    def append_row(self, values: list, **kwargs):
+        self.append_rows([values])
+
+    def append_rows(self, values: list[list], **kwargs):
+        self.calls += 1
+        if self.fail_with:
+            raise self.fail_with.pop(0)
+        self.rows.extend(list(v) for v in values)
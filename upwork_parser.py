@@ -0,0 +1,569 @@
+import os
+import sys
+import glob
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+
+from extraction import extract_terms
+from records import JobRecord, job_id_from_url
+
+
+TILE_LABEL = "search_results_impression"
+
+# HTML engine used when PARSER_BACKEND is not set: "bs4" or "lxml"
+DEFAULT_PARSER_BACKEND = "bs4"
+
+# Recent snapshot hashes / tile job ids remembered by SnapshotFilter
+TILE_CACHE = int(os.getenv("TILE_CACHE", "5000"))
+
+
+def clean_text(value: str) -> str:
+    if not value:
+        return ""
+    return " ".join(value.split())
+
+
+# ------------ TILE INDEX ------------
+
+class TileIndex:
+    """
+    data-test / data-ev-label lookup table for one job tile, built in a
+    single walk over the tile so parse_project never re-scans the subtree.
+    Values are (tag, element) pairs in document order. `within` keeps a
+    lookup to the descendants of one element, like find(parent, ...) did;
+    `inside(el, parent)` is the engine's ancestor check.
+    """
+    __slots__ = ("tests", "labels", "inside")
+
+    def __init__(self, inside):
+        self.tests = {}
+        self.labels = {}
+        self.inside = inside
+
+    def add(self, tag, el, test=None, label=None):
+        if test:
+            self.tests.setdefault(test, []).append((tag, el))
+        if label:
+            self.labels.setdefault(label, []).append((tag, el))
+
+    def first(self, test, tag=None, within=None):
+        for el_tag, el in self.tests.get(test, ()):
+            if (tag is None or el_tag == tag) and (within is None or self.inside(el, within)):
+                return el
+        return None
+
+    def all(self, test, tag=None, within=None):
+        return [
+            el for el_tag, el in self.tests.get(test, ())
+            if (tag is None or el_tag == tag) and (within is None or self.inside(el, within))
+        ]
+
+
+# ------------ ENGINES ------------
+
+class Bs4Engine:
+    """
+    The original BeautifulSoup + html.parser engine (pure Python).
+    """
+    name = "bs4"
+
+    def tiles(self, html_content):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html_content, "html.parser")
+        return soup.find_all(attrs={"data-ev-label": TILE_LABEL})
+
+    def find(self, el, tag=None, test=None, cls=None):
+        attrs = {"data-test": test} if test else {}
+        if cls:
+            return el.find(tag, attrs=attrs, class_=cls)
+        return el.find(tag, attrs=attrs)
+
+    def find_all(self, el, tag=None, test=None):
+        attrs = {"data-test": test} if test else {}
+        return el.find_all(tag, attrs=attrs)
+
+    def text(self, el, sep="", strip=False):
+        return el.get_text(separator=sep, strip=strip)
+
+    def get(self, el, name, default=""):
+        return el.get(name, default)
+
+    def remove(self, el):
+        el.extract()
+
+    @staticmethod
+    def _inside(el, parent):
+        return any(p is parent for p in el.parents)
+
+    def index(self, div) -> TileIndex:
+        index = TileIndex(self._inside)
+        for el in div.descendants:
+            attrs = getattr(el, "attrs", None)
+            if attrs:
+                test = attrs.get("data-test")
+                label = attrs.get("data-ev-label")
+                if test or label:
+                    index.add(el.name, el, test, label)
+        return index
+
+
+class LxmlEngine:
+    """
+    C-backed engine on top of lxml.html. Lookups are compiled XPath
+    expressions on the same data-test attributes the bs4 engine uses.
+    """
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html
+
+        self._etree = etree
+        self._html = html
+        self._xpaths = {}
+
+    def tiles(self, html_content):
+        if isinstance(html_content, str):
+            html_content = html_content.encode("utf-8")
+        parser = self._html.HTMLParser(encoding="utf-8")
+        root = self._html.document_fromstring(html_content, parser=parser)
+        return self._xpath(f'.//*[@data-ev-label="{TILE_LABEL}"]')(root)
+
+    def _xpath(self, expr):
+        compiled = self._xpaths.get(expr)
+        if compiled is None:
+            compiled = self._xpaths[expr] = self._etree.XPath(expr)
+        return compiled
+
+    def _expr(self, tag, test, cls):
+        expr = f".//{tag or '*'}"
+        if test:
+            expr += f'[@data-test="{test}"]'
+        if cls:
+            expr += f'[contains(concat(" ", normalize-space(@class), " "), " {cls} ")]'
+        return expr
+
+    def find(self, el, tag=None, test=None, cls=None):
+        found = self._xpath(self._expr(tag, test, cls) + "[1]")(el)
+        return found[0] if found else None
+
+    def find_all(self, el, tag=None, test=None):
+        return self._xpath(self._expr(tag, test, None))(el)
+
+    def text(self, el, sep="", strip=False):
+        parts = el.itertext()
+        if strip:
+            parts = (p.strip() for p in parts)
+            parts = [p for p in parts if p]
+        return sep.join(parts)
+
+    def get(self, el, name, default=""):
+        return el.get(name, default)
+
+    def remove(self, el):
+        el.drop_tree()
+
+    @staticmethod
+    def _inside(el, parent):
+        return any(p is parent for p in el.iterancestors())
+
+    def index(self, div) -> TileIndex:
+        index = TileIndex(self._inside)
+        for el in div.iterdescendants(self._etree.Element):
+            test = el.get("data-test")
+            label = el.get("data-ev-label")
+            if test or label:
+                index.add(el.tag, el, test, label)
+        return index
+
+    def iter_tiles(self, file_path: str, chunk_size: int = 64 * 1024):
+        """
+        Streams a snapshot from disk and yields each job tile as soon as its
+        closing tag was parsed. Everything outside the tile being yielded is
+        discarded on the fly, so memory stays bounded by one tile instead of
+        the whole page.
+        """
+        parser = self._etree.HTMLPullParser(events=("start", "end"), encoding="utf-8")
+        parser.set_element_class_lookup(self._html.HtmlElementClassLookup())
+        depth = 0
+
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if chunk:
+                    parser.feed(chunk)
+                else:
+                    parser.close()
+
+                for event, el in parser.read_events():
+                    is_tile = el.get("data-ev-label") == TILE_LABEL
+                    if event == "start":
+                        if is_tile:
+                            depth += 1
+                        continue
+
+                    if is_tile:
+                        depth -= 1
+                        if depth == 0:
+                            yield el
+
+                    if depth == 0:
+                        # Drop the finished subtree and any siblings before it
+                        el.clear(keep_tail=True)
+                        parent = el.getparent()
+                        if parent is not None:
+                            while el.getprevious() is not None:
+                                del parent[0]
+
+                if not chunk:
+                    break
+
+
+ENGINES = {
+    "bs4": Bs4Engine,
+    "lxml": LxmlEngine,
+}
+
+_engines = {}
+
+
+def get_engine(name: str | None = None):
+    """
+    Returns the (cached) engine instance for `name`, defaulting to the
+    PARSER_BACKEND environment variable.
+    """
+    name = (name or os.getenv("PARSER_BACKEND") or DEFAULT_PARSER_BACKEND).lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown parser backend: {name}")
+    if name not in _engines:
+        _engines[name] = ENGINES[name]()
+    return _engines[name]
+
+
+# ------------ PARSING ------------
+
+def tile_key(div, engine) -> str | None:
+    """The job id of a tile, read from its title link alone."""
+    link = engine.find(div, "a", test="job-tile-title-link UpLink")
+    if link is None:
+        return None
+    return job_id_from_url(engine.get(link, "href", ""))
+
+
+def _parse_tiles(tiles, engine, skip=None) -> list:
+    records = []
+    for div in tiles:
+        if skip is not None and skip(tile_key(div, engine)):
+            continue
+        project_details = parse_project(div, engine)
+        if project_details:
+            records.append(project_details)
+    return records
+
+
+def parse_snapshot(html_content, engine=None, skip=None) -> list:
+    """
+    Parses every job tile of a saved search page, oldest first.
+    Tiles whose job id `skip(job_id)` accepts are left out unparsed.
+    """
+    engine = engine or get_engine()
+    tiles = list(engine.tiles(html_content))
+    tiles.reverse()
+    return _parse_tiles(tiles, engine, skip)
+
+
+def parse_snapshot_file(file_path: str, engine=None, streaming: bool | None = None, skip=None) -> list:
+    """
+    Parses a snapshot file, oldest first. With streaming on (PARSER_STREAMING=1)
+    the file is fed to lxml in chunks and every tile goes to parse_project as
+    soon as it closes; only the small result records are kept for the page.
+    """
+    if streaming is None:
+        streaming = os.getenv("PARSER_STREAMING", "0").lower() in ("1", "true", "yes")
+
+    if not streaming:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return parse_snapshot(f.read(), engine, skip)
+
+    engine = get_engine("lxml")
+    records = _parse_tiles(engine.iter_tiles(file_path), engine, skip)
+    records.reverse()
+    return records
+
+
+# ------------ INCREMENTAL PARSING ------------
+
+class SnapshotFilter:
+    """
+    Remembers the content hashes of recent snapshot files and the job ids
+    of recently handled tiles (`capacity` of each, least recently seen
+    dropped first).
+
+    It lives with the consumer: known() hands the parser what is already
+    confirmed, and confirm() records a snapshot only once the pipeline has
+    handled it, so a snapshot that failed is parsed in full when it comes
+    back. A page saved again unchanged then costs one hash of the file,
+    and a page with a couple of new tiles on top only pays parse_project
+    for those. This is a shortcut in front of the dedup store, not a
+    replacement: a tile it forgets is parsed and dropped by dedup as before.
+    """
+
+    def __init__(self, capacity: int = TILE_CACHE):
+        self.capacity = capacity
+        self._files = OrderedDict()
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, cache: OrderedDict, key):
+        if key in cache:
+            cache.move_to_end(key)
+            return
+        cache[key] = None
+        if len(cache) > self.capacity:
+            cache.popitem(last=False)
+
+    def known(self) -> tuple[frozenset, frozenset]:
+        """(file digests, tile job ids) confirmed so far, for parse_new_tiles."""
+        with self._lock:
+            return frozenset(self._files), frozenset(self._tiles)
+
+    def confirm(self, digest: bytes | None, records):
+        """Remembers a handled snapshot and the job ids of its records."""
+        with self._lock:
+            if digest is not None:
+                self._remember(self._files, digest)
+            for record in records:
+                self._remember(self._tiles, record.job_id)
+
+
+def snapshot_digest(file_path: str) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def parse_new_tiles(file_path: str, known_files: frozenset = frozenset(), known_tiles: frozenset = frozenset(),
+                    engine=None, streaming: bool | None = None) -> tuple[bytes, list]:
+    """
+    parse_snapshot_file for the monitor: skips a file whose digest is in
+    `known_files` and every tile whose job id is in `known_tiles` (see
+    SnapshotFilter.known). Returns (digest of the file, records); pass both
+    to SnapshotFilter.confirm once the records are handled.
+    """
+    digest = snapshot_digest(file_path)
+    if digest in known_files:
+        print(f"Snapshot unchanged, skipped: {file_path}")
+        return digest, []
+    skip = known_tiles.__contains__ if known_tiles else None
+    return digest, parse_snapshot_file(file_path, engine, streaming, skip=skip)
+
+
+def parse_project(div, engine=None):
+    engine = engine or get_engine()
+    find = engine.find
+    text = engine.text
+
+    try:
+        # Timestamp
+        jst = timezone(timedelta(hours=10))
+        posted_time = datetime.now(jst).strftime("%m/%d %H:%M")
+
+        index = engine.index(div)
+
+        # ----- TITLE -----
+        title_link = index.first("job-tile-title-link UpLink", "a")
+        if title_link is None:
+            title_link = find(div, "a", cls="air3-link")
+
+        if title_link is None:
+            return None
+
+        project_title = clean_text(text(title_link, sep=" ", strip=True))
+
+        href = engine.get(title_link, "href", "")
+        project_url = href if href.startswith("http") else "https://www.upwork.com" + href
+
+        # ----- POSTED AGO -----
+        header = index.first("JobTileHeader")
+        small = find(header, "small") if header is not None else None
+        if small is not None:
+            spans = engine.find_all(small, "span")
+            if len(spans) > 1:
+                project_posted = clean_text(text(spans[1]))
+            else:
+                project_posted = clean_text(text(small))
+        else:
+            project_posted = "None"
+
+        # ----- PAYMENT VERIFIED -----
+        payment_el = index.first("payment-verified")
+        if payment_el is not None:
+            badge = index.first("UpCVerifiedBadge", within=payment_el)
+            sr = find(badge, "span", cls="sr-only") if badge is not None else None
+            raw = text(sr).strip() if sr is not None else ""
+            project_verified = f"Payment {raw.lower()}" if raw else "Payment status unknown"
+        else:
+            project_verified = "None"
+
+        project_verified = clean_text(project_verified)
+
+        # ----- SPENT -----
+        spent_el = index.first("total-spent")
+        if spent_el is not None:
+            strong = find(spent_el, "strong")
+            span = find(spent_el, "span")
+            if strong is not None and span is not None:
+                project_spent = clean_text(f"{text(strong)} {text(span)}")
+            else:
+                project_spent = clean_text(text(spent_el))
+        else:
+            project_spent = "No spent"
+
+        # ----- LOCATION -----
+        loc_el = index.first("location")
+        if loc_el is not None:
+            sr = find(loc_el, "span", cls="sr-only")
+            if sr is not None:
+                engine.remove(sr)
+            project_location = clean_text(text(loc_el))
+        else:
+            project_location = "None"
+
+        # ----- DETAILS (job type + level + budget + duration) -----
+        job_info_ul = index.first("JobInfo", "ul")
+
+        job_type = ""
+        experience = ""
+        duration = ""
+        budget = ""
+
+        if job_info_ul is not None:
+            # JOB TYPE (Fixed / Hourly / Hourly range)
+            type_el = index.first("job-type-label", "li", within=job_info_ul)
+            if type_el is not None:
+                job_type = clean_text(text(type_el))
+
+            # EXPERIENCE LEVEL
+            exp_el = index.first("experience-level", "li", within=job_info_ul)
+            if exp_el is not None:
+                experience = clean_text(text(exp_el))
+
+            # DURATION
+            dur_el = index.first("duration-label", "li", within=job_info_ul)
+            if dur_el is not None:
+                duration = clean_text(text(dur_el))
+
+            # BUDGET (fixed price)
+            fixed_el = index.first("is-fixed-price", "li", within=job_info_ul)
+            if fixed_el is not None:
+                budget = clean_text(text(fixed_el))
+
+            # HOURLY RANGE
+            hourly_el = index.first("is-hourly", "li", within=job_info_ul)
+            if hourly_el is not None and not budget:
+                budget = clean_text(text(hourly_el))
+
+        details_parts = [x for x in [job_type, experience, budget, duration] if x]
+        project_details_info = " | ".join(details_parts)
+
+        # ----- DESCRIPTION -----
+        desc_el = index.first("UpCLineClamp JobDescription", "div")
+        description = clean_text(text(desc_el)) if desc_el is not None else ""
+        if len(description) > 3000:
+            description = description[:3000]
+
+        # ----- SKILLS -----
+        skills_el = index.first("TokenClamp JobAttrs")
+        if skills_el is not None:
+            skills = [
+                clean_text(text(span))
+                for span in index.all("token", within=skills_el)
+            ]
+            skills_text = ", ".join(skills)
+        else:
+            skills_text = "No skills"
+
+        terms = extract_terms(project_details_info, project_spent)
+
+        return JobRecord(
+            posted_ago=project_posted,
+            posted_time=posted_time,
+            title=project_title,
+            url=project_url,
+            total_spent=project_spent,
+            location=project_location,
+            details=project_details_info,
+            description=description,
+            skills=skills_text,
+            payment_status=project_verified,
+            **asdict(terms),
+        )
+
+    except Exception as e:
+        print("Parse error:", e)
+        return None
+
+
+# ------------ PARITY CHECK ------------
+
+# Sanitized snapshots checked by `python upwork_parser.py` without arguments
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def check_parity(file_path: str) -> int:
+    """
+    Parses a stored snapshot with every engine and prints the records
+    that differ from the reference: the expected records in <name>.json
+    next to a fixture, else bs4. Returns the number of mismatches.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        html_content = f.read()
+
+    results = {}
+    for name in ENGINES:
+        results[name] = parse_snapshot(html_content, get_engine(name))
+    results["lxml-stream"] = parse_snapshot_file(file_path, streaming=True)
+
+    for name, records in results.items():
+        # posted_time is the wall clock, not page content
+        results[name] = [{**r.to_dict(), "posted_time": ""} for r in records]
+
+    reference_name = "bs4"
+    expected_path = os.path.splitext(file_path)[0] + ".json"
+    if os.path.exists(expected_path):
+        with open(expected_path, "r", encoding="utf-8") as f:
+            results["expected"] = json.load(f)
+        reference_name = "expected"
+
+    reference = results[reference_name]
+    mismatches = 0
+    for name, records in results.items():
+        if name == reference_name:
+            continue
+        if len(records) != len(reference):
+            print(f"{file_path}: {name} found {len(records)} tiles, {reference_name} has {len(reference)}")
+            mismatches += 1
+            continue
+        for expected, got in zip(reference, records):
+            if expected != got:
+                print(f"{file_path}: {name} differs on {expected['url']}")
+                for field, value in expected.items():
+                    if got.get(field) != value:
+                        print(f"  {field}: {reference_name}={value!r}\n  {field}: {name}={got.get(field)!r}")
+                mismatches += 1
+
+    print(f"{file_path}: {len(reference)} tiles, {mismatches} mismatches")
+    return mismatches
+
+
+if __name__ == '__main__':
+    # python upwork_parser.py [upwork*.html]; the fixtures when no files are given
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+    failed = sum(check_parity(path) for path in paths)
+    sys.exit(1 if failed else 0)
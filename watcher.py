@@ -0,0 +1,222 @@
+import os
+import stat
+import struct
+import asyncio
+import ctypes
+import ctypes.util
+
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_snapshot_name(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("upwork") and name.endswith(".html")
+
+
+def _signature(path: str) -> tuple[int, float] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_size, st.st_mtime
+
+
+def _scan(directory=".") -> dict[str, tuple[int, float]]:
+    """(size, mtime) of every upwork*.html file in `directory`; files removed mid-scan are skipped."""
+    found = {}
+    for name in os.listdir(directory):
+        if is_snapshot_name(name):
+            full = os.path.join(directory, name)
+            sig = _signature(full)
+            if sig:
+                found[full] = sig
+    return found
+
+
+def list_snapshots(directory=".") -> list[str]:
+    """
+    All finished upwork*.html files in `directory`, oldest first.
+    """
+    found = _scan(directory)
+    return sorted(found, key=lambda path: found[path][1])
+
+
+class _Inotify:
+    """Minimal ctypes binding around inotify_init1 / inotify_add_watch."""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, "inotify_add_watch failed")
+
+        self.fd = fd
+
+    def read_events(self):
+        """
+        Yields (mask, name) for every event currently buffered on the fd.
+        """
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            yield mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SnapshotWatcher:
+    """
+    Feeds every finished upwork*.html snapshot into an ordered asyncio queue.
+
+    On Linux the directory is watched with inotify and a file is only queued
+    once it was closed after writing (IN_CLOSE_WRITE) or renamed into place
+    (IN_MOVED_TO), so half-written snapshots are never parsed. Elsewhere, or
+    when inotify cannot be set up, the directory is polled and a file is only
+    queued after its size and mtime stayed the same across two polls.
+
+    Files already present at start() are queued first, oldest first.
+    Call done(path) once a snapshot has been handled so that a later save
+    under the same name is picked up again, or retry(path, delay) to have
+    it queued again after a failure.
+    """
+
+    def __init__(self, directory=".", poll_interval: float = 1.0, use_inotify: bool = True):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.queue: asyncio.Queue[str] = asyncio.Queue()
+        self._pending: set[str] = set()
+        self._dirty: set[str] = set()
+        self._queued_sigs: dict[str, tuple[int, float]] = {}
+        self._inotify = None
+        self._poll_task = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify else "polling"
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify(self.directory)
+                loop.add_reader(self._inotify.fd, self._on_inotify)
+            except (OSError, AttributeError, NotImplementedError) as e:
+                print(f"inotify unavailable, falling back to polling: {e}")
+                self._inotify = None
+
+        # Seed with whatever was saved while we were not watching
+        found = _scan(self.directory)
+        for path in sorted(found, key=lambda p: found[p][1]):
+            self._queued_sigs[path] = found[path]
+            self._enqueue(path)
+
+        if not self._inotify:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    def stop(self):
+        if self._inotify:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+    def done(self, path: str):
+        self._pending.discard(path)
+        self.queue.task_done()
+        # Saved again while it was queued or being handled: queue the new version
+        if path in self._dirty:
+            self._dirty.discard(path)
+            self._requeue(path)
+
+    def changed(self, path: str) -> bool:
+        """True if `path` was saved again after it was queued (do not delete it)."""
+        return path in self._dirty
+
+    def retry(self, path: str, delay: float):
+        """Like done(), then queues `path` again after `delay` seconds if it is still there."""
+        self.done(path)
+        asyncio.get_running_loop().call_later(delay, self._requeue, path)
+
+    def _requeue(self, path: str):
+        if _signature(path):
+            self._enqueue(path)
+
+    def _enqueue(self, path: str):
+        if path in self._pending:
+            self._dirty.add(path)
+            return
+        self._pending.add(path)
+        self.queue.put_nowait(path)
+
+    def _on_inotify(self):
+        for mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # Kernel dropped events, rescan the directory instead
+                for path in list_snapshots(self.directory):
+                    self._enqueue(path)
+                continue
+
+            if not is_snapshot_name(name):
+                continue
+
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                self._enqueue(path)
+
+    async def _poll(self):
+        last_seen: dict[str, tuple[int, float]] = {}
+
+        while True:
+            try:
+                current = _scan(self.directory)
+
+                queued = self._queued_sigs
+                for path, sig in current.items():
+                    # Stable across two polls and not already queued in this state
+                    if last_seen.get(path) == sig and queued.get(path) != sig:
+                        queued[path] = sig
+                        self._enqueue(path)
+
+                last_seen = current
+                self._queued_sigs = {p: sig for p, sig in queued.items() if p in current}
+            except Exception as e:
+                print(f"Polling error: {e}")
+            await asyncio.sleep(self.poll_interval)